@@ -1,10 +1,40 @@
+import sqlite3
+import sys
+import zlib
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from sqlalchemy import Text, JSON
-from typing import List, Optional
+from functools import lru_cache
+from sqlalchemy import Engine, Text, JSON, TypeDecorator, event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import object_session, selectinload, undefer
 
 db = SQLAlchemy()
 
+# Timestamps are filled in by SQLite (UTC) instead of a Python call per row.
+# `default` inlines it into each INSERT so tables created by older versions get it too;
+# `server_default` puts it in the DDL of newly created tables.
+# CURRENT_TIMESTAMP only has whole seconds, so this uses %f (milliseconds) padded to the
+# six fractional digits SQLAlchemy writes and parses for DateTime columns on SQLite.
+db_now = db.func.strftime('%Y-%m-%d %H:%M:%f000', 'now')
+
+# Connection settings for a read-heavy local chat database: WAL lets the sidebar read
+# while a chat turn is being written, and synchronous=NORMAL is durable enough under WAL
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',  # 256 MB
+    'PRAGMA cache_size=-65536',  # 64 MB
+    'PRAGMA temp_store=MEMORY',
+)
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
 # Association tables for many-to-many relationships
 conversation_tags = db.Table('conversation_tags',
     db.Column('conversation_id', db.Integer, db.ForeignKey('conversation.id'), primary_key=True),
@@ -16,12 +46,68 @@ project_conversations = db.Table('project_conversations',
     db.Column('conversation_id', db.Integer, db.ForeignKey('conversation.id'), primary_key=True)
 )
 
+class InternedString(TypeDecorator):
+    """String column for low-cardinality values such as roles and MIME types
+
+    SQLite already stores text at its actual length, so values stay as text on
+    disk; loaded values are interned so every row shares one str per distinct value.
+    """
+    impl = db.String
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return sys.intern(value) if value is not None else None
+
+class CompressedText(TypeDecorator):
+    """Text column that stores longer values zlib-compressed
+
+    Values under COMPRESS_MIN_LENGTH characters are stored as plain text, so short
+    values and rows written before compression was added are returned unchanged.
+    """
+    impl = Text
+    cache_ok = True
+
+    COMPRESS_MIN_LENGTH = 1024
+
+    def process_bind_param(self, value, dialect):
+        if value is None or len(value) < self.COMPRESS_MIN_LENGTH:
+            return value
+        return zlib.compress(value.encode('utf-8'))
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return zlib.decompress(value).decode('utf-8')
+        return value
+
+class SerializableMixin:
+    """Builds the column part of to_dict() from a per-class column list
+
+    Models list the columns they expose in `serialize_columns`; the names are
+    checked against the mapper once per class. Datetimes are left as-is and
+    written out as ISO 8601 by the app's JSON provider.
+    """
+    serialize_columns = ()
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _column_keys(cls):
+        column_attrs = inspect(cls).column_attrs
+        return tuple(column_attrs[key].key for key in cls.serialize_columns)
+
+    def _columns_to_dict(self):
+        state = self.__dict__
+        # Loaded values live in __dict__; fall back to getattr for expired/unloaded ones
+        return {
+            key: state[key] if key in state else getattr(self, key)
+            for key in self._column_keys()
+        }
+
 class User(db.Model):
     """User model - keeping simple for now, can expand later"""
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, default='admin')
     email = db.Column(db.String(120), unique=True, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
     
     # Field to track setup completion
     setup_complete = db.Column(db.Boolean, default=False, nullable=False)
@@ -32,46 +118,74 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
-class Project(db.Model):
+_default_user_id = None
+
+def get_default_user_id():
+    """Id of the single local user, looked up once and then remembered"""
+    global _default_user_id
+    if _default_user_id is None:
+        _default_user_id = db.session.execute(db.select(User.id).order_by(User.id).limit(1)).scalar()
+    return _default_user_id
+
+class Project(SerializableMixin, db.Model):
     """Project model - top-level organization with file storage"""
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(Text, nullable=True)
     color = db.Column(db.String(7), default='#667eea')  # Hex color for UI
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
+    updated_at = db.Column(db.DateTime, default=db_now, server_default=db_now, onupdate=db_now)
     
     # Settings/configuration as JSON
-    settings = db.Column(JSON, default=dict)
+    # `default` covers tables created before the server default existed; create_all() doesn't alter them
+    settings = db.Column(JSON, nullable=False, default=dict, server_default=db.text("'{}'"))
     
     # Relationships
     conversations = db.relationship('Conversation', secondary=project_conversations, 
                                   back_populates='projects', lazy='dynamic')
     files = db.relationship('ProjectFile', backref='project', lazy=True, cascade='all, delete-orphan')
     
+    serialize_columns = ('id', 'name', 'description', 'color', 'created_at')
+    
     def __repr__(self):
         return f'<Project {self.name}>'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'color': self.color,
-            'created_at': self.created_at.isoformat(),
-            'conversation_count': self.conversations.count(),
-            'file_count': len(self.files)
-        }
+    def to_dict(self, conversation_count=None):
+        if conversation_count is None:
+            conversation_count = self.conversations.count()
+        data = self._columns_to_dict()
+        data['conversation_count'] = conversation_count
+        data['file_count'] = len(self.files)
+        return data
+
+    @classmethod
+    def bulk_to_dict(cls, projects):
+        """Serialize several projects, counting their conversations in one grouped query
+
+        Load the projects with selectinload(Project.files) so the file counts don't
+        each emit a query.
+        """
+        counts = {}
+        project_ids = [project.id for project in projects]
+        if project_ids:
+            counts = dict(db.session.query(
+                project_conversations.c.project_id,
+                db.func.count(project_conversations.c.conversation_id)
+            ).filter(
+                project_conversations.c.project_id.in_(project_ids)
+            ).group_by(project_conversations.c.project_id).all())
+
+        return [project.to_dict(conversation_count=counts.get(project.id, 0)) for project in projects]
 
-class Conversation(db.Model):
+class Conversation(SerializableMixin, db.Model):
     """Conversation model - represents a chat session"""
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     model_name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
+    updated_at = db.Column(db.DateTime, default=db_now, server_default=db_now, onupdate=db_now)
     
     # Conversation metadata
     message_count = db.Column(db.Integer, default=0)
@@ -79,84 +193,143 @@ class Conversation(db.Model):
     is_favorite = db.Column(db.Boolean, default=False)
     
     # Relationships
-    messages = db.relationship('Message', backref='conversation', lazy=True, 
-                             cascade='all, delete-orphan', order_by='Message.created_at')
+    # Ordering is applied in SQL, including inside selectinload() batches
+    messages = db.relationship('Message', backref='conversation', lazy='select', 
+                             cascade='all, delete-orphan', order_by='(Message.created_at, Message.id)')
 
     tags = db.relationship('Tag', secondary=conversation_tags, back_populates='conversations')
     projects = db.relationship('Project', secondary=project_conversations, back_populates='conversations')
 
+    __table_args__ = (
+        db.Index('ix_conv_user_updated', 'user_id', 'is_archived', 'updated_at'),
+    )
+
     @property
     def all_attachments(self):
         """Get all attachments from all messages in this conversation"""
-        attachments = []
-        for message in self.messages:
-            attachments.extend(message.attachments)
-        return attachments
+        return (MessageAttachment.query
+                .join(Message, Message.id == MessageAttachment.message_id)
+                .filter(Message.conversation_id == self.id)
+                .all())
+
+    @classmethod
+    def load_with_messages(cls, ids):
+        """Load conversations with their messages and attachments in a fixed number of queries"""
+        return (cls.query
+                .filter(cls.id.in_(ids))
+                .options(selectinload(cls.messages).options(
+                    undefer(Message.content),
+                    selectinload(Message.attachments)
+                ))
+                .all())
+
+    def messages_with_attachments(self):
+        """Get all messages in this conversation with their attachments loaded"""
+        return (Message.query
+                .options(undefer(Message.content), selectinload(Message.attachments))
+                .filter_by(conversation_id=self.id)
+                .order_by(Message.created_at, Message.id)
+                .all())
+
+    serialize_columns = ('id', 'title', 'model_name', 'created_at', 'updated_at',
+                         'message_count', 'is_archived', 'is_favorite')
 
     def __repr__(self):
         return f'<Conversation {self.title}>'
     
     def to_dict(self, include_messages=False):
-        data = {
-            'id': self.id,
-            'title': self.title,
-            'model_name': self.model_name,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'message_count': self.message_count,
-            'is_archived': self.is_archived,
-            'is_favorite': self.is_favorite,
-            'tags': [tag.to_dict() for tag in self.tags],
-            'projects': [{'id': p.id, 'name': p.name, 'color': p.color} for p in self.projects]
-        }
+        """Serialize the conversation.
+
+        Tags and projects are read as plain collections; callers listing many
+        conversations should preload them with selectinload().
+        """
+        data = self._columns_to_dict()
+        data['tags'] = [{'id': t.id, 'name': t.name, 'color': t.color} for t in self.tags]
+        data['projects'] = [{'id': p.id, 'name': p.name, 'color': p.color} for p in self.projects]
         if include_messages:
-            data['messages'] = [msg.to_dict() for msg in self.messages]
+            # Use the collection if a loader already filled it, otherwise batch-load it here
+            if 'messages' in self.__dict__:
+                messages = self.messages
+            else:
+                messages = self.messages_with_attachments()
+            data['messages'] = [msg.to_dict() for msg in messages]
             
         return data
     
     def generate_title(self):
         """Auto-generate title from first user message"""
-        first_message = Message.query.filter_by(
+        # Only pull one character past the cut-off so we know if it was truncated
+        first_content = db.session.query(
+            db.func.substr(Message.content, 1, 51)
+        ).filter_by(
             conversation_id=self.id, 
             role='user'
-        ).first()
+        ).order_by(Message.created_at, Message.id).limit(1).scalar()
         
-        if first_message:
+        if first_content is not None:
             # Take first 50 chars, cut at word boundary
-            title = first_message.content[:50]
-            if len(first_message.content) > 50:
+            title = first_content[:50]
+            if len(first_content) > 50:
                 title = title.rsplit(' ', 1)[0] + '...'
             return title
         return f'Conversation {self.id}'
 
-class Message(db.Model):
+class Message(SerializableMixin, db.Model):
     """Message model - individual messages in conversations"""
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
-    role = db.Column(db.String(20), nullable=False)  # 'user' or 'assistant'
-    content = db.Column(Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    role = db.Column(InternedString(20), nullable=False)  # 'user' or 'assistant'
+    content = db.deferred(db.Column(Text, nullable=False))  # Loaded on access; undefer() when serializing
+    created_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
     
     attachments = db.relationship('MessageAttachment', backref='message', lazy=True, 
                             cascade='all, delete-orphan')
 
     # Optional metadata
-    message_metadata = db.Column(JSON, default=dict)  # For storing extra info like tokens, processing time, etc.
+    message_metadata = db.Column(JSON, nullable=False, default=dict, server_default=db.text("'{}'"))  # For storing extra info like tokens, processing time, etc.
+    
+    __table_args__ = (
+        db.Index('ix_msg_conv_role_created', 'conversation_id', 'role', 'created_at'),
+    )
+    
+    serialize_columns = ('id', 'role', 'content', 'created_at', 'message_metadata')
     
     def __repr__(self):
         return f'<Message {self.role}: {self.content[:50]}...>'
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'role': self.role,
-            'content': self.content,
-            'created_at': self.created_at.isoformat(),
-            'message_metadata': self.message_metadata or {},
-            'attachments': [att.to_dict() for att in self.attachments]
-        }
+        data = self._columns_to_dict()
+        data['message_metadata'] = data['message_metadata'] or {}
+        data['attachments'] = [att.to_dict() for att in self.attachments]
+        return data
+
+def _conversation_being_deleted(message):
+    """Whether the message is going away because its whole conversation is"""
+    session = object_session(message)
+    return session is not None and any(
+        isinstance(obj, Conversation) and obj.id == message.conversation_id
+        for obj in session.deleted
+    )
 
-class MessageAttachment(db.Model):
+@event.listens_for(Message, 'after_insert')
+def _increment_message_count(mapper, connection, target):
+    connection.execute(
+        db.update(Conversation.__table__)
+        .where(Conversation.id == target.conversation_id)
+        .values(message_count=Conversation.message_count + 1, updated_at=db_now)
+    )
+
+@event.listens_for(Message, 'after_delete')
+def _decrement_message_count(mapper, connection, target):
+    if _conversation_being_deleted(target):
+        return
+    connection.execute(
+        db.update(Conversation.__table__)
+        .where(Conversation.id == target.conversation_id)
+        .values(message_count=Conversation.message_count - 1, updated_at=db_now)
+    )
+
+class MessageAttachment(SerializableMixin, db.Model):
     """File attachments for messages"""
     id = db.Column(db.Integer, primary_key=True)
     message_id = db.Column(db.Integer, db.ForeignKey('message.id'), nullable=False)
@@ -164,51 +337,79 @@ class MessageAttachment(db.Model):
     original_filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
-    mime_type = db.Column(db.String(100), nullable=False)
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    mime_type = db.Column(InternedString(100), nullable=False)
+    uploaded_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
     
     # File content for AI context
-    extracted_text = db.Column(Text, nullable=True)  # Extracted text content
+    extracted_text = db.deferred(db.Column(CompressedText, nullable=True))  # Extracted text content, loaded on access
+    extracted_text_length = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     is_processed = db.Column(db.Boolean, default=False)
     processing_error = db.Column(Text, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_att_msg', 'message_id'),
+    )
+    
+    serialize_columns = ('id', 'filename', 'original_filename', 'file_size', 'mime_type',
+                         'uploaded_at', 'is_processed')
+    
     def __repr__(self):
         return f'<MessageAttachment {self.original_filename}>'
     
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert many attachments in one executemany
+        
+        Args:
+            rows (list): Dicts with message_id, filename, original_filename, file_path,
+                file_size, mime_type and extracted_text keys
+        """
+        if not rows:
+            return
+        
+        # Core inserts skip the 'set' listener, so fill in what it would have
+        for row in rows:
+            row['extracted_text_length'] = len(row['extracted_text']) if row['extracted_text'] else 0
+            row['is_processed'] = bool(row['extracted_text'])
+        
+        db.session.execute(db.insert(cls.__table__), rows)
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'filename': self.filename,
-            'original_filename': self.original_filename,
-            'file_size': self.file_size,
-            'mime_type': self.mime_type,
-            'uploaded_at': self.uploaded_at.isoformat(),
-            'is_processed': self.is_processed,
-            'has_text': bool(self.extracted_text)
-        }
+        data = self._columns_to_dict()
+        data['has_text'] = self.extracted_text_length > 0
+        return data
+
+@event.listens_for(MessageAttachment.extracted_text, 'set')
+def _track_extracted_text_length(target, value, oldvalue, initiator):
+    target.extracted_text_length = len(value) if value else 0
 
-class Tag(db.Model):
+class Tag(SerializableMixin, db.Model):
     """Tag model - unstructured tags for organizing conversations"""
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     color = db.Column(db.String(7), default='#6c757d')  # Hex color
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
     
     # Relationships
     conversations = db.relationship('Conversation', secondary=conversation_tags, back_populates='tags')
     
+    # Counted in SQL alongside each tag row rather than by loading the collection
+    conversation_count = db.column_property(
+        db.select(db.func.count(conversation_tags.c.conversation_id))
+        .where(conversation_tags.c.tag_id == id)
+        .correlate_except(conversation_tags)
+        .scalar_subquery()
+    )
+    
+    serialize_columns = ('id', 'name', 'color', 'conversation_count')
+    
     def __repr__(self):
         return f'<Tag {self.name}>'
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'color': self.color,
-            'conversation_count': len(self.conversations)
-        }
+        return self._columns_to_dict()
 
-class ProjectFile(db.Model):
+class ProjectFile(SerializableMixin, db.Model):
     """File model - files associated with projects for knowledge injection"""
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
@@ -216,44 +417,84 @@ class ProjectFile(db.Model):
     original_filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
-    mime_type = db.Column(db.String(100), nullable=False)
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    mime_type = db.Column(InternedString(100), nullable=False)
+    uploaded_at = db.Column(db.DateTime, default=db_now, server_default=db_now)
     
     # For future vector search capabilities
     is_processed = db.Column(db.Boolean, default=False)
     processing_error = db.Column(Text, nullable=True)
     
     # File content metadata
-    content_preview = db.Column(Text, nullable=True)  # First few hundred chars
-    file_metadata = db.Column(JSON, default=dict)  # File-specific metadata
+    content_preview = db.deferred(db.Column(Text, nullable=True))  # First few hundred chars, loaded on access
+    file_metadata = db.Column(JSON, nullable=False, default=dict, server_default=db.text("'{}'"))  # File-specific metadata
+    
+    # content_preview is deferred, so it is left out here rather than loaded one row at a time;
+    # query with undefer(ProjectFile.content_preview) where the previews are needed
+    serialize_columns = ('id', 'filename', 'original_filename', 'file_size', 'mime_type',
+                         'uploaded_at', 'is_processed')
     
     def __repr__(self):
         return f'<ProjectFile {self.original_filename}>'
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'filename': self.filename,
-            'original_filename': self.original_filename,
-            'file_size': self.file_size,
-            'mime_type': self.mime_type,
-            'uploaded_at': self.uploaded_at.isoformat(),
-            'is_processed': self.is_processed,
-            'content_preview': self.content_preview
-        }
+        return self._columns_to_dict()
+
+# Bump whenever tables, columns or indexes are added so existing databases get them on next start
+SCHEMA_VERSION = 3
+
+# Columns added to existing tables after their first release:
+# (table, column, column DDL, backfill statement or None)
+ADDED_COLUMNS = [
+    ('message_attachment', 'extracted_text_length', 'INTEGER NOT NULL DEFAULT 0',
+     'UPDATE message_attachment SET extracted_text_length = COALESCE(length(extracted_text), 0)'),
+    ('user', 'setup_complete', 'BOOLEAN NOT NULL DEFAULT 0', None),
+]
+
+def _add_missing_columns(connection):
+    """Add columns that create_all() cannot add to tables which already exist"""
+    inspector = inspect(connection)
+    for table, column, ddl, backfill in ADDED_COLUMNS:
+        existing_columns = {c['name'] for c in inspector.get_columns(table)}
+        if column in existing_columns:
+            continue
+        connection.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+        if backfill:
+            connection.execute(db.text(backfill))
+        print(f"Added {column} column to {table}")
 
 def init_db(app):
     """Initialize database with app context"""
     db.init_app(app)
     
     with app.app_context():
-        db.create_all()
+        # Schema changes run in one transaction and are skipped entirely once
+        # the database is stamped with the current version
+        with db.engine.begin() as connection:
+            schema_version = connection.execute(db.text('PRAGMA user_version')).scalar()
+            if schema_version < SCHEMA_VERSION:
+                db.metadata.create_all(connection)
+                _add_missing_columns(connection)
+                
+                # create_all() skips tables that already exist, so indexes added to
+                # the models later have to be created on older databases explicitly
+                for table in db.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(connection, checkfirst=True)
+                
+                connection.execute(db.text(f'PRAGMA user_version = {SCHEMA_VERSION}'))
         
-        # Create default user if none exists
-        if not User.query.first():
-            default_user = User(username='admin', email='admin@localhost')
-            db.session.add(default_user)
-            db.session.commit()
+        # Create default user if none exists, without loading any user row
+        result = db.session.execute(
+            sqlite_insert(User)
+            .values(id=1, username='admin', email='admin@localhost')
+            .on_conflict_do_nothing()
+        )
+        db.session.commit()
+        if result.rowcount:
             print("Created default user: admin")
         
+        # Forget any user id remembered from a previously initialized database
+        global _default_user_id
+        _default_user_id = None
+        
         print("Database initialized successfully!")
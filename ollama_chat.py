@@ -1,16 +1,38 @@
-from flask import Flask, render_template, request, jsonify, Response, send_from_directory, session
-import base64
+from flask import (Flask, render_template, request, jsonify, Response, send_from_directory, session,
+                   current_app, has_app_context)
+from flask_caching import Cache
 import json
+import logging
 import os
 import requests
 import sys
+from requests.adapters import HTTPAdapter
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.security import safe_join
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
 
 from utils import *
 from models import *
 
+logger = logging.getLogger(__name__)
+
+@event.listens_for(Session, 'after_commit')
+def _clear_list_cache(session):
+    """Empty the committing app's list endpoint cache
+
+    Registered once here rather than in create_app(), which the launcher calls
+    again each time the server is restarted in-process.
+    """
+    if has_app_context():
+        for backend in current_app.extensions.get('cache', {}).values():
+            backend.clear()
+
 def create_app():
     """Application factory for creating Flask app"""
     app = Flask(__name__)
+    app.json = WoolyJSONProvider(app)
 
     # Get data directory from environment or use current directory
     data_dir = os.environ.get('WOOLYCHAT_DATA_DIR', os.getcwd())
@@ -23,9 +45,18 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['MAX_CONTENT_LENGTH'] = 5242880 # 5MB limit
     app.config['UPLOAD_FOLDER'] = uploads_dir
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    # When served behind nginx, set this to an `internal` location aliased to the uploads
+    # directory and nginx will send the files itself instead of streaming them through Flask
+    app.config['XACCEL_UPLOADS_PREFIX'] = os.environ.get('WOOLYCHAT_XACCEL_UPLOADS_PREFIX')
 
     # Ensure upload directory exists
     os.makedirs(uploads_dir, exist_ok=True)
+
+    # Persist compiled template bytecode so new processes skip parsing/compiling templates
+    jinja_cache_dir = os.path.join(data_dir, '.jinja_cache')
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
     
     print(f"📁 Using data directory: {data_dir}")
     print(f"📁 Database: {db_path}")
@@ -34,9 +65,21 @@ def create_app():
     # Ollama base URL
     OLLAMA_BASE_URL = 'http://localhost:11434'
 
+    # Keep-alive connection pool to Ollama, shared by every request
+    ollama = requests.Session()
+    ollama.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0))
+
     # Initialize utilities
     file_manager = FileManager(app.config['UPLOAD_FOLDER'], app.config['MAX_CONTENT_LENGTH'])
 
+    # Short-lived cache for the sidebar list endpoints, emptied whenever anything is committed
+    # (see _clear_list_cache)
+    cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 30})
+
+    def cache_ok(rv):
+        """Only cache successful responses, not (body, status) error tuples"""
+        return not isinstance(rv, tuple)
+
     # Theme definitions (same as before)
     THEMES = {
         'ocean_breeze': {
@@ -119,8 +162,10 @@ def create_app():
         }
     }
 
+    THEME_NAMES = tuple(THEMES)
     DEFAULT_THEME = 'zebra'
 
+    @lru_cache(maxsize=32)
     def get_theme_css_vars(theme_name):
         """Generate CSS custom properties for a theme"""
         theme = THEMES.get(theme_name, THEMES[DEFAULT_THEME])
@@ -142,7 +187,7 @@ def create_app():
         return {
             'accent_theme_colors': get_theme_css_vars(current_theme),
             'current_theme': current_theme,
-            'available_themes': THEMES.keys()
+            'available_themes': THEME_NAMES
         }
 
     # ==== MAIN ROUTES ====
@@ -156,7 +201,7 @@ def create_app():
     def get_models():
         """Proxy endpoint to get available Ollama models"""
         try:
-            response = requests.get(f'{OLLAMA_BASE_URL}/api/tags')
+            response = ollama.get(f'{OLLAMA_BASE_URL}/api/tags')
             response.raise_for_status()
             return jsonify(response.json())
         except requests.RequestException as e:
@@ -173,43 +218,52 @@ def create_app():
             conversation_id = data.get('conversation_id')
             attachments = data.get('attachments', [])
             
-            print(f"Chat request: model={model}, message_len={len(message) if message else 0}, "
-                  f"history_len={len(history)}, conv_id={conversation_id}, attachments={len(attachments)}")
+            logger.debug("Chat request: model=%s, message_len=%d, history_len=%d, conv_id=%s, attachments=%d",
+                         model, len(message) if message else 0, len(history), conversation_id, len(attachments))
             
             # Process attachments to extract images and text
             images_base64 = []
             text_content = message
             
             if attachments:
-                file_context = "\n\n--- ATTACHED FILES ---\n"
+                file_context_parts = ["\n\n--- ATTACHED FILES ---\n"]
+                
+                # Skip attachments whose files have gone missing
+                attachments_on_disk = [
+                    attachment for attachment in attachments
+                    if attachment.get('file_path') and os.path.exists(attachment.get('file_path'))
+                ]
+                documents = [
+                    attachment for attachment in attachments_on_disk
+                    if not attachment.get('mime_type').startswith('image/')
+                ]
                 
-                for attachment in attachments:
+                # Documents are extracted in worker processes while the images are encoded below
+                extracted_texts = TextExtractor.extract_many(
+                    [(attachment['file_path'], attachment['mime_type']) for attachment in documents]
+                )
+                
+                for attachment in attachments_on_disk:
                     file_path = attachment.get('file_path')
-                    mime_type = attachment.get('mime_type')
-                    original_filename = attachment.get('original_filename')
-                    
-                    if file_path and os.path.exists(file_path):
-                        if mime_type.startswith('image/'):
-                            # Convert image to base64 for Ollama
-                            try:
-                                with open(file_path, 'rb') as img_file:
-                                    img_data = img_file.read()
-                                    img_base64 = base64.b64encode(img_data).decode('utf-8')
-                                    images_base64.append(img_base64)
-                            except Exception as e:
-                                print(f"Error encoding image {file_path}: {e}")
-                        else:
-                            # For non-image files, extract text content
-                            extracted_text = TextExtractor.extract_text(file_path, mime_type)
-                            if extracted_text:
-                                file_context += f"\nFile: {original_filename}\n"
-                                file_context += f"Type: {mime_type}\n"
-                                truncated_text = TextExtractor.truncate_text(extracted_text, max_chars=4000)
-                                file_context += f"Content:\n{truncated_text}\n---\n"
+                    if attachment.get('mime_type').startswith('image/'):
+                        # Convert image to base64 for Ollama
+                        try:
+                            images_base64.append(FileManager.encode_base64(file_path))
+                        except Exception as e:
+                            logger.warning("Error encoding image %s: %s", file_path, e)
+                
+                # For non-image files, add the extracted text content
+                for attachment, extracted_text in zip(documents, extracted_texts):
+                    if extracted_text:
+                        truncated_text = TextExtractor.truncate_text(extracted_text, max_chars=4000)
+                        file_context_parts.append(
+                            f"\nFile: {attachment.get('original_filename')}\nType: {attachment.get('mime_type')}\n"
+                            f"Content:\n{truncated_text}\n---\n"
+                        )
                 
                 # Add file context only if there were non-image files
-                if "File:" in file_context:
-                    text_content = f"{message}{file_context}"
+                if len(file_context_parts) > 1:
+                    text_content = message + ''.join(file_context_parts)
             
             # Build the user message for Ollama
             user_message = {'role': 'user', 'content': text_content}
@@ -221,7 +275,7 @@ def create_app():
             # Format messages for Ollama API
             messages = history + [user_message]
             
-            ollama_response = requests.post(
+            ollama_response = ollama.post(
                 f'{OLLAMA_BASE_URL}/api/chat',
                 json={
                     'model': model,
@@ -236,50 +290,54 @@ def create_app():
                 return jsonify({'error': f'Ollama error: {error_text}'}), ollama_response.status_code
             
             def generate():
-                content_sent = False
                 assistant_response = ""
                 
-                for line in ollama_response.iter_lines():
-                    if line:
+                # Ollama streams with chunked encoding, so each read returns as soon as a chunk
+                # arrives; the larger size just stops long chunks being split and re-joined
+                for line in ollama_response.iter_lines(chunk_size=64 * 1024):
+                    # Frames without content (errors, and the final done frame, which Ollama
+                    # encodes as "content":"") carry nothing to forward, so skip parsing them
+                    if line and b'"content"' in line and b'"content":""' not in line:
                         try:
-                            line_text = line.decode('utf-8')
-                            data = json.loads(line_text)
+                            data = app.json.loads(line)
                             if 'message' in data and 'content' in data['message']:
                                 content = data['message']['content']
                                 if content:
-                                    content_sent = True
                                     assistant_response += content
-                                    yield f'{json.dumps({"content": content})}\n'
+                                    yield app.json.dumps({"content": content}) + '\n'
                         except (json.JSONDecodeError, Exception) as e:
-                            print(f"Error processing line: {e}")
+                            logger.debug("Error processing line: %s", e)
                             continue
                 
                 # Save conversation with attachments
                 if conversation_id and assistant_response and message:
                     with app.app_context():
                         try:
-                            # Save user message
-                            user_message_id = ConversationManager.save_message(conversation_id, 'user', message)
+                            # Save user message, attachments and assistant response in one transaction
+                            user_message_id = ConversationManager.save_message(conversation_id, 'user', message, commit=False)
                             
                             # Save attachments to database
                             if user_message_id and attachments:
-                                file_manager.save_multiple_attachments(user_message_id, attachments)
+                                file_manager.save_multiple_attachments(user_message_id, attachments, commit=False)
                             
                             # Save assistant response
-                            ConversationManager.save_message(conversation_id, 'assistant', assistant_response)
+                            ConversationManager.save_message(conversation_id, 'assistant', assistant_response, commit=False)
                             
-                        except Exception as e:
-                            print(f"Error saving messages with attachments: {e}")
+                            db.session.commit()
+                        except Exception:
+                            logger.exception("Error saving messages with attachments")
+                            db.session.rollback()
             
-            return Response(generate(), mimetype='text/plain')
+            response = Response(generate(), mimetype='text/plain')
+            # Hand the pooled connection back even if the browser disconnects mid-stream
+            response.call_on_close(ollama_response.close)
+            return response
             
         except requests.RequestException as e:
-            print(f"Request error: {e}")
+            logger.error("Request error: %s", e)
             return jsonify({'error': str(e)}), 500
         except Exception as e:
-            print(f"Unexpected error in chat endpoint: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Unexpected error in chat endpoint")
             return jsonify({'error': str(e)}), 500
 
     # ==== FILE UPLOAD ENDPOINTS ====
@@ -297,10 +355,10 @@ def create_app():
             # Get file info
             original_filename = file.filename
             
-            # Read file to get size
-            file_content = file.read()
-            file_size = len(file_content)
-            file.seek(0)  # Reset file pointer
+            # Get size by seeking the spooled upload rather than reading it into memory
+            file.stream.seek(0, os.SEEK_END)
+            file_size = file.stream.tell()
+            file.stream.seek(0)
             
             # Get MIME type
             mime_type = file_manager.get_mime_type(original_filename)
@@ -310,12 +368,13 @@ def create_app():
             if not is_valid:
                 return jsonify({'error': error_message}), 400
             
-            # Generate unique filename and save
+            # Generate unique filename and save, keeping the text of plain-text files as it is written
             unique_filename = file_manager.generate_unique_filename(original_filename)
-            file_path = file_manager.save_file(file, unique_filename)
+            file_path, extracted_text = file_manager.save_and_capture_text(file, unique_filename, mime_type)
             
-            # Extract text content
-            extracted_text = TextExtractor.extract_text(file_path, mime_type)
+            # Extract text content from other types in a worker process
+            if extracted_text is None:
+                extracted_text = TextExtractor.submit(file_path, mime_type).result()
             
             # Return file info
             file_info = {
@@ -334,27 +393,40 @@ def create_app():
             return jsonify(file_info), 200
             
         except Exception as e:
-            print(f"Upload error: {e}")
+            logger.exception("Upload error")
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/files/<filename>')
     def serve_file(filename):
         """Serve uploaded files"""
         try:
+            xaccel_prefix = app.config['XACCEL_UPLOADS_PREFIX']
+            if xaccel_prefix:
+                file_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+                if file_path is None or not os.path.isfile(file_path):
+                    return jsonify({'error': 'File not found'}), 404
+                
+                response = Response(mimetype=file_manager.get_mime_type(filename))
+                response.headers['X-Accel-Redirect'] = f"{xaccel_prefix.rstrip('/')}/{filename}"
+                return response
+            
             return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
         except Exception as e:
             return jsonify({'error': str(e)}), 404
 
     # ==== CONVERSATION MANAGEMENT ENDPOINTS ====
     @app.route('/api/conversations', methods=['GET'])
+    @cache.cached(key_prefix=lambda: f'conversations:{get_default_user_id()}', response_filter=cache_ok)
     def get_conversations():
         """Get all conversations for the current user"""
         try:
-            user = User.query.first()
-            conversations = Conversation.query.filter_by(
-                user_id=user.id, 
+            conversations = Conversation.query.options(
+                selectinload(Conversation.tags),
+                selectinload(Conversation.projects)
+            ).filter_by(
+                user_id=get_default_user_id(), 
                 is_archived=False
-            ).order_by(Conversation.updated_at.desc()).all()
+            ).order_by(Conversation.updated_at.desc(), Conversation.id.desc()).all()
             
             return jsonify([conv.to_dict() for conv in conversations])
         except Exception as e:
@@ -365,12 +437,11 @@ def create_app():
         """Create a new conversation"""
         try:
             data = request.json
-            user = User.query.first()
             
             conversation = Conversation(
                 title=data.get('title', 'New Conversation'),
                 model_name=data.get('model_name', ''),
-                user_id=user.id
+                user_id=get_default_user_id()
             )
             
             db.session.add(conversation)
@@ -421,7 +492,9 @@ def create_app():
             return jsonify({'error': str(e)}), 500
 
     # ==== TAG MANAGEMENT ====
-    @app.route('/api/tags', methods=['GET'])
+    # GET /api/tags is the Ollama model list above, so the tag list has its own path
+    @app.route('/api/conversation-tags', methods=['GET'])
+    @cache.cached(key_prefix='tags', response_filter=cache_ok)
     def get_tags():
         """Get all tags"""
         try:
@@ -448,12 +521,14 @@ def create_app():
 
     # ==== PROJECT MANAGEMENT ====
     @app.route('/api/projects', methods=['GET'])
+    @cache.cached(key_prefix=lambda: f'projects:{get_default_user_id()}', response_filter=cache_ok)
     def get_projects():
         """Get all projects for the current user"""
         try:
-            user = User.query.first()
-            projects = Project.query.filter_by(user_id=user.id).all()
-            return jsonify([project.to_dict() for project in projects])
+            projects = Project.query.options(
+                selectinload(Project.files)
+            ).filter_by(user_id=get_default_user_id()).all()
+            return jsonify(Project.bulk_to_dict(projects))
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -462,13 +537,12 @@ def create_app():
         """Create a new project"""
         try:
             data = request.json
-            user = User.query.first()
             
             project = Project(
                 name=data['name'],
                 description=data.get('description', ''),
                 color=data.get('color', '#667eea'),
-                user_id=user.id
+                user_id=get_default_user_id()
             )
             
             db.session.add(project)
@@ -485,7 +559,7 @@ def create_app():
         current_theme = session.get('theme', DEFAULT_THEME)
         return jsonify({
             'current_theme': current_theme,
-            'available_themes': list(THEMES.keys())
+            'available_themes': THEME_NAMES
         })
 
     @app.route('/api/settings/theme', methods=['POST'])
@@ -508,7 +582,7 @@ def create_app():
     def health_check():
         """Health check endpoint"""
         try:
-            response = requests.get(f'{OLLAMA_BASE_URL}/api/tags', timeout=5)
+            response = ollama.get(f'{OLLAMA_BASE_URL}/api/tags', timeout=5)
             ollama_status = 'connected' if response.status_code == 200 else 'disconnected'
         except:
             ollama_status = 'disconnected'
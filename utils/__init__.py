@@ -5,32 +5,69 @@ Utility modules for WoolyChat application
 from .file_manager import FileManager
 from .conversation_manager import ConversationManager
 from .text_extractor import TextExtractor
+from .json_provider import WoolyJSONProvider
 
 import socket
+import time
 
-def get_available_port(start_port):
+def get_available_port(start_port, max_attempts=100):
     """
     Attempts to find an available port to run the Flask app.
     
     Args:
         start_port (int): The starting port number to check
+        max_attempts (int): How many consecutive ports to try
     
     Returns:
         int: The first available port number
+    
+    Raises:
+        RuntimeError: If no port in the range is free
     """
 
-    # Create a socket object
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        # Attempt to bind the socket to an address and the desired port
-        sock.bind(('0.0.0.0', start_port))
-        sock.close()
+    for port in range(start_port, start_port + max_attempts):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if hasattr(socket, 'SO_EXCLUSIVEADDRUSE'):
+                # Windows: SO_REUSEADDR would let the bind succeed on a port another
+                # process is listening on, so ask for exclusive use instead
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                # POSIX: still fails on a listening port, but skips ports in TIME_WAIT
+                # the same way the Werkzeug server's own bind does
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(('0.0.0.0', port))
+                return port
+            except OSError:
+                # The port is in use, try the next one
+                continue
+
+    raise RuntimeError(f"No available port between {start_port} and {start_port + max_attempts - 1}")
 
-        # If the above line doesn't raise an exception, it means the port is available
-        return start_port
+def wait_for_port(host, port, timeout=10.0, interval=0.05):
+    """
+    Waits until a server accepts TCP connections on host:port.
+    
+    Args:
+        host (str): The host the server listens on
+        port (int): The port the server listens on
+        timeout (float): How many seconds to keep trying
+        interval (float): Seconds to sleep between attempts
     
-    except socket.error:
-        # The port is in use. Try the next port by incrementing start_port
-        return get_available_port(start_port + 1)
+    Returns:
+        bool: True once a connection succeeds, False if timeout passes first
+    """
+
+    deadline = time.monotonic() + timeout
+    while True:
+        # Check before sleeping, so a server that is already up returns at once
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return True
+        except OSError:
+            if time.monotonic() >= deadline:
+                return False
+        time.sleep(interval)
 
-__all__ = ['FileManager', 'ConversationManager', 'TextExtractor', 'get_available_port']
\ No newline at end of file
+__all__ = ['FileManager', 'ConversationManager', 'TextExtractor', 'WoolyJSONProvider', 'get_available_port',
+           'wait_for_port']
\ No newline at end of file
@@ -1,22 +1,26 @@
 from models import db, Conversation, Message
+from sqlalchemy import inspect, update
 from .text_extractor import TextExtractor
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class ConversationManager:
     """Handles conversation and message operations"""
     
     @staticmethod
-    def save_message(conversation_id, role, content):
-        """Save a message to a conversation and return message ID"""
+    def save_message(conversation_id, role, content, commit=True):
+        """Save a message to a conversation and return message ID (commit=False leaves the transaction open)"""
         try:
-            print(f"Attempting to save {role} message to conversation {conversation_id}")
+            logger.debug("Attempting to save %s message to conversation %s", role, conversation_id)
             
             conversation = Conversation.query.get(conversation_id)
             if not conversation:
-                print(f"Conversation {conversation_id} not found!")
+                logger.warning("Conversation %s not found", conversation_id)
                 return None
             
-            print(f"Found conversation: {conversation.title}")
+            logger.debug("Found conversation: %s", conversation.title)
             
             message = Message(
                 conversation_id=conversation_id,
@@ -28,33 +32,27 @@ class ConversationManager:
             db.session.flush()  # Flush to get the message ID
             
             message_id = message.id
-            print(f"Message saved with ID: {message_id}")
+            logger.debug("Message saved with ID: %s", message_id)
             
-            # Update conversation metadata
-            current_count = Message.query.filter_by(conversation_id=conversation_id).count()
-            conversation.message_count = current_count
+            # message_count and updated_at are bumped by Message's after_insert listener
             
             # Auto-generate title if it's the first user message and title is generic
-            if role == 'user' and ConversationManager._should_update_title(conversation.title):
+            title = conversation.title
+            if role == 'user' and (title == 'New Conversation' or title.startswith('Conversation')):
                 new_title = ConversationManager._generate_title_from_content(content)
                 conversation.title = new_title
-                print(f"Updated conversation title to: {new_title}")
+                logger.debug("Updated conversation title to: %s", new_title)
             
-            db.session.commit()
-            print(f"Successfully saved {role} message")
+            if commit:
+                db.session.commit()
+            logger.debug("Successfully saved %s message", role)
             return message_id
             
-        except Exception as e:
-            print(f"Error saving message: {e}")
+        except Exception:
+            logger.exception("Error saving message")
             db.session.rollback()
             return None
     
-    @staticmethod
-    def _should_update_title(current_title):
-        """Check if conversation title should be auto-updated"""
-        return (current_title == 'New Conversation' or 
-                current_title.startswith('Conversation'))
-    
     @staticmethod
     def _generate_title_from_content(content):
         """Generate a conversation title from message content"""
@@ -69,40 +67,44 @@ class ConversationManager:
         if not attachments:
             return message
         
-        enhanced_message = message
-        file_context = "\n\n--- ATTACHED FILES ---\n"
+        file_context_parts = [message, "\n\n--- ATTACHED FILES ---\n"]
         
-        for attachment in attachments:
-            file_path = attachment.get('file_path')
-            if file_path and os.path.exists(file_path):
-                mime_type = attachment.get('mime_type')
-                extracted_text = TextExtractor.extract_text(file_path, mime_type)
-                
-                file_context += f"\nFile: {attachment.get('original_filename')}\n"
-                file_context += f"Type: {mime_type}\n"
-                
-                if extracted_text:
-                    # Truncate text to prevent token overflow
-                    truncated_text = TextExtractor.truncate_text(extracted_text, max_chars=4000)
-                    file_context += f"Content:\n{truncated_text}\n"
-                else:
-                    file_context += "Content: [Could not extract text]\n"
-                
-                file_context += "---\n"
+        attachments_on_disk = [
+            attachment for attachment in attachments
+            if attachment.get('file_path') and os.path.exists(attachment.get('file_path'))
+        ]
+        extracted_texts = TextExtractor.extract_many(
+            [(attachment['file_path'], attachment.get('mime_type')) for attachment in attachments_on_disk]
+        )
+        
+        for attachment, extracted_text in zip(attachments_on_disk, extracted_texts):
+            mime_type = attachment.get('mime_type')
+            
+            file_context_parts.append(f"\nFile: {attachment.get('original_filename')}\n")
+            file_context_parts.append(f"Type: {mime_type}\n")
+            
+            if extracted_text:
+                # Truncate text to prevent token overflow
+                truncated_text = TextExtractor.truncate_text(extracted_text, max_chars=4000)
+                file_context_parts.append(f"Content:\n{truncated_text}\n")
+            else:
+                file_context_parts.append("Content: [Could not extract text]\n")
+            
+            file_context_parts.append("---\n")
         
-        return f"{message}{file_context}"
+        return ''.join(file_context_parts)
     
     @staticmethod
     def get_conversation_with_messages(conversation_id):
         """Get conversation with all messages and attachments"""
         try:
-            conversation = Conversation.query.get(conversation_id)
-            if not conversation:
+            conversations = Conversation.load_with_messages([conversation_id])
+            if not conversations:
                 return None
             
-            return conversation.to_dict(include_messages=True)
-        except Exception as e:
-            print(f"Error fetching conversation {conversation_id}: {e}")
+            return conversations[0].to_dict(include_messages=True)
+        except Exception:
+            logger.exception("Error fetching conversation %s", conversation_id)
             return None
     
     @staticmethod
@@ -116,8 +118,8 @@ class ConversationManager:
             db.session.delete(conversation)
             db.session.commit()
             return True
-        except Exception as e:
-            print(f"Error deleting conversation {conversation_id}: {e}")
+        except Exception:
+            logger.exception("Error deleting conversation %s", conversation_id)
             db.session.rollback()
             return False
     
@@ -125,18 +127,32 @@ class ConversationManager:
     def update_conversation_metadata(conversation_id, **kwargs):
         """Update conversation metadata (title, favorite, archived, etc.)"""
         try:
-            conversation = Conversation.query.get(conversation_id)
+            column_keys = inspect(Conversation).column_attrs.keys()
+            values = {key: value for key, value in kwargs.items() if key in column_keys and key != 'id'}
+            
+            if values and db.engine.dialect.update_returning:
+                # One UPDATE ... RETURNING instead of a SELECT followed by an UPDATE
+                conversation = db.session.execute(
+                    update(Conversation)
+                    .where(Conversation.id == conversation_id)
+                    .values(**values)
+                    .returning(Conversation)
+                ).scalar_one_or_none()
+            else:
+                conversation = db.session.get(Conversation, conversation_id)
+                if conversation:
+                    for key, value in values.items():
+                        setattr(conversation, key, value)
+            
             if not conversation:
+                db.session.rollback()
                 return None
             
-            for key, value in kwargs.items():
-                if hasattr(conversation, key):
-                    setattr(conversation, key, value)
-            
+            # Serialize before committing so the returned row isn't expired and reloaded
+            result = conversation.to_dict()
             db.session.commit()
-            return conversation.to_dict()
-        except Exception as e:
-            print(f"Error updating conversation {conversation_id}: {e}")
+            return result
+        except Exception:
+            logger.exception("Error updating conversation %s", conversation_id)
             db.session.rollback()
             return None
-
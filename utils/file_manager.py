@@ -1,32 +1,95 @@
+import io
+import logging
 import os
-import uuid
+import secrets
 import mimetypes
-import math
+import mmap
+from functools import lru_cache
+
+try:
+    import pybase64 as base64  # SIMD encoder, same API as the stdlib module
+except ImportError:
+    import base64
 from werkzeug.utils import secure_filename
 from models import db, MessageAttachment
 
+logger = logging.getLogger(__name__)
+
+# Allowed file types
+ALLOWED_EXTENSIONS = frozenset({
+    'txt', 'pdf', 'doc', 'docx', 'md', 'rtf',  # Text documents
+    'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp',  # Images
+    'csv', 'xlsx', 'xls',  # Data files
+    'json', 'xml', 'html', 'htm'  # Structured data
+})
+
+ALLOWED_MIME_TYPES = frozenset({
+    'text/plain', 'text/markdown', 'text/csv', 'text/html', 'text/xml',
+    'application/pdf', 'application/json',
+    'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/webp'
+})
+
+EXTENSION_NOT_ALLOWED_ERROR = f"File type not allowed. Supported types: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
+
+# Known types, looked up before mimetypes so results don't depend on the OS registry
+MIME_TYPES_BY_EXTENSION = {
+    'txt': 'text/plain',
+    'md': 'text/markdown',
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xls': 'application/vnd.ms-excel',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'webp': 'image/webp',
+    'html': 'text/html',
+    'htm': 'text/html',
+    'xml': 'text/xml',
+    'rtf': 'application/rtf'
+}
+
+# Types whose extracted text is the whole file, so it can be captured while saving
+TEXT_CAPTURE_MIME_TYPES = frozenset({
+    'text/plain', 'text/markdown', 'application/json', 'text/html', 'text/xml'
+})
+
+REQUIRED_ATTACHMENT_KEYS = ('filename', 'original_filename', 'file_path', 'file_size', 'mime_type')
+
+FILE_SIZE_UNITS = ("B", "KB", "MB", "GB")
+FILE_SIZE_DIVISORS = (1, 1024, 1024 ** 2, 1024 ** 3)
+
+def split_extension(filename):
+    """Split a filename into (name, lowercased extension) with a single scan"""
+    dot = filename.rfind('.')
+    if dot < 0:
+        return filename, ''
+    return filename[:dot], filename[dot + 1:].lower()
+
+@lru_cache(maxsize=512)
+def mime_type_for_extension(ext):
+    """MIME type for a lowercased extension, resolved once per extension"""
+    mime_type = MIME_TYPES_BY_EXTENSION.get(ext)
+    if not mime_type and ext:
+        mime_type, _ = mimetypes.guess_type(f'file.{ext}')
+    return mime_type or 'application/octet-stream'
+
 class FileManager:
     """Handles file upload, validation, and storage operations"""
     
     def __init__(self, upload_folder, max_file_size=5242880): # Max file size = 5MB
         self.upload_folder = upload_folder
         self.max_file_size = max_file_size
-        
-        # Allowed file types
-        self.allowed_extensions = {
-            'txt', 'pdf', 'doc', 'docx', 'md', 'rtf',  # Text documents
-            'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp',  # Images
-            'csv', 'xlsx', 'xls',  # Data files
-            'json', 'xml', 'html', 'htm'  # Structured data
-        }
-        
-        self.allowed_mime_types = {
-            'text/plain', 'text/markdown', 'text/csv', 'text/html', 'text/xml',
-            'application/pdf', 'application/json',
-            'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/webp'
-        }
+        self.allowed_extensions = ALLOWED_EXTENSIONS
+        self.allowed_mime_types = ALLOWED_MIME_TYPES
+        self._file_too_large_error = f"File too large. Maximum size is {self.format_file_size(max_file_size)}"
 
         # Ensure upload directory exists
         os.makedirs(self.upload_folder, exist_ok=True)
@@ -38,12 +101,12 @@ class FileManager:
         
         # Check file size
         if file_size > self.max_file_size:
-            return False, f"File too large. Maximum size is {self.format_file_size(self.max_file_size)}"
+            return False, self._file_too_large_error
         
         # Check extension
-        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        _, extension = split_extension(filename)
         if extension not in self.allowed_extensions:
-            return False, f"File type not allowed. Supported types: {', '.join(sorted(self.allowed_extensions))}"
+            return False, EXTENSION_NOT_ALLOWED_ERROR
         
         # Check MIME type
         if mimetype not in self.allowed_mime_types:
@@ -53,59 +116,59 @@ class FileManager:
     
     def get_mime_type(self, filename):
         """Get MIME type from filename with fallback"""
-        mime_type, _ = mimetypes.guess_type(filename)
-        if not mime_type:
-            ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-            mime_type = self._get_mime_type_from_extension(ext)
-        return mime_type
+        _, ext = split_extension(filename)
+        return mime_type_for_extension(ext)
     
     def _get_mime_type_from_extension(self, ext):
         """Get MIME type from file extension as fallback"""
-        mime_map = {
-            'txt': 'text/plain',
-            'md': 'text/markdown',
-            'csv': 'text/csv',
-            'json': 'application/json',
-            'pdf': 'application/pdf',
-            'doc': 'application/msword',
-            'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'xls': 'application/vnd.ms-excel',
-            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif',
-            'bmp': 'image/bmp',
-            'webp': 'image/webp',
-            'html': 'text/html',
-            'htm': 'text/html',
-            'xml': 'text/xml',
-            'rtf': 'application/rtf'
-        }
-        return mime_map.get(ext, 'application/octet-stream')
+        return MIME_TYPES_BY_EXTENSION.get(ext, 'application/octet-stream')
     
     def generate_unique_filename(self, original_filename):
         """Generate a unique filename while preserving extension"""
-        file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-        unique_filename = f"{uuid.uuid4().hex}.{file_extension}" if file_extension else uuid.uuid4().hex
+        _, file_extension = split_extension(original_filename)
+        token = secrets.token_hex(16)
+        unique_filename = f"{token}.{file_extension}" if file_extension else token
         return unique_filename
     
     def save_file(self, file, filename):
-        """Save file to upload directory"""
+        """Save file to upload directory, copying it in 1 MB blocks"""
         file_path = os.path.join(self.upload_folder, filename)
-        file.save(file_path)
+        file.save(file_path, buffer_size=1024 * 1024)
         return file_path
     
+    def save_and_capture_text(self, file, filename, mime_type):
+        """Save file and, for plain-text types, keep its decoded text from the same pass
+        
+        Returns (file_path, text); text is None when the type needs a real extractor.
+        """
+        if mime_type not in TEXT_CAPTURE_MIME_TYPES:
+            return self.save_file(file, filename), None
+        
+        file_path = os.path.join(self.upload_folder, filename)
+        buffer = io.BytesIO()
+        with open(file_path, 'wb') as f:
+            while True:
+                chunk = file.stream.read(64 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+                buffer.write(chunk)
+        
+        text = buffer.getvalue().decode('utf-8', 'replace')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return file_path, text
+    
     def delete_file(self, filename):
         """Delete file from upload directory"""
         try:
-            file_path = os.path.join(self.upload_folder, filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-        except Exception as e:
-            print(f"Error deleting file {filename}: {e}")
-        return False
+            os.unlink(os.path.join(self.upload_folder, filename))
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError:
+            logger.exception("Error deleting file %s", filename)
+            return False
     
     def save_attachment_to_db(self, message_id, file_info, extracted_text=None):
         """Save file attachment info to database"""
@@ -124,44 +187,61 @@ class FileManager:
             db.session.add(attachment)
             db.session.commit()
             return attachment
-        except Exception as e:
-            print(f"Error saving attachment to database: {e}")
+        except Exception:
+            logger.exception("Error saving attachment to database")
             db.session.rollback()
             return None
     
-    def save_multiple_attachments(self, message_id, attachments_data):
-        """Save multiple file attachments for a message"""
+    def save_multiple_attachments(self, message_id, attachments_data, commit=True):
+        """Save multiple file attachments for a message (commit=False leaves the transaction open)"""
+        # Reject incomplete attachments before touching the session, so a bad request
+        # doesn't roll back whatever else the caller has pending
+        for attachment_data in attachments_data:
+            missing = [key for key in REQUIRED_ATTACHMENT_KEYS if key not in attachment_data]
+            if missing:
+                logger.error("Error saving attachments: missing %s", ', '.join(missing))
+                return []
+        
         try:
-            saved_attachments = []
-            for attachment_data in attachments_data:
-                attachment = MessageAttachment(
-                    message_id=message_id,
-                    filename=attachment_data.get('filename'),
-                    original_filename=attachment_data.get('original_filename'),
-                    file_path=attachment_data.get('file_path'),
-                    file_size=attachment_data.get('file_size'),
-                    mime_type=attachment_data.get('mime_type'),
-                    extracted_text=attachment_data.get('extracted_text'),
-                    is_processed=bool(attachment_data.get('extracted_text'))
-                )
-                db.session.add(attachment)
-                saved_attachments.append(attachment)
+            # Every row has the same keys so the insert runs as a single executemany
+            rows = [
+                {
+                    'message_id': message_id,
+                    'filename': attachment_data['filename'],
+                    'original_filename': attachment_data['original_filename'],
+                    'file_path': attachment_data['file_path'],
+                    'file_size': attachment_data['file_size'],
+                    'mime_type': attachment_data['mime_type'],
+                    'extracted_text': attachment_data.get('extracted_text'),
+                }
+                for attachment_data in attachments_data
+            ]
+            MessageAttachment.bulk_create(rows)
             
-            db.session.commit()
-            print(f"Saved {len(saved_attachments)} attachments for message {message_id}")
-            return saved_attachments
-        except Exception as e:
-            print(f"Error saving attachments: {e}")
+            if commit:
+                db.session.commit()
+            logger.debug("Saved %d attachments for message %s", len(rows), message_id)
+            return rows
+        except Exception:
+            logger.exception("Error saving attachments")
             db.session.rollback()
             return []
     
+    @staticmethod
+    def encode_base64(file_path):
+        """Base64-encode a file straight from a memory map, without reading it into a buffer"""
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ''  # Empty files cannot be mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return base64.b64encode(mapped).decode('ascii')
+    
     @staticmethod
     def format_file_size(bytes_size):
         """Convert bytes to human readable format"""
         if bytes_size == 0:
             return "0 B"
-        size_names = ["B", "KB", "MB", "GB"]
-        i = int(math.floor(math.log(bytes_size, 1024)))
-        p = math.pow(1024, i)
-        s = round(bytes_size / p, 2)
-        return f"{s} {size_names[i]}"
+        # Every unit is 2**10 of the previous one, so the index is just the bit length / 10
+        i = min((bytes_size.bit_length() - 1) // 10, len(FILE_SIZE_UNITS) - 1)
+        s = round(bytes_size / FILE_SIZE_DIVISORS[i], 2)
+        return f"{s} {FILE_SIZE_UNITS[i]}"
@@ -0,0 +1,35 @@
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class WoolyJSONProvider(DefaultJSONProvider):
+    """JSON provider that writes datetimes as ISO 8601 and uses orjson when it is installed"""
+
+    @staticmethod
+    def default(o):
+        """Fallback for types neither encoder handles natively"""
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        """Serialize to a JSON string, datetimes included, in C when orjson is available"""
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        """Parse a JSON string or bytes"""
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -1,79 +1,146 @@
+import logging
+import mmap
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Document parsers are optional and imported once per process instead of on every extraction
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    from docx import Document
+except ImportError:
+    Document = None
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-heavy extraction (PDF/Word parsing), started on first use.
+# That first use is inside a request of the threaded server, so the workers are spawned
+# rather than forked from a process whose other threads may hold locks mid-operation.
+_extract_pool = None
+
+def _warm_up_worker():
+    """Pool initializer: unpickling it imports this module, and with it the parsers
+    above, when the worker starts rather than during its first extraction"""
+
+def _get_extract_pool():
+    global _extract_pool
+    if _extract_pool is None:
+        _extract_pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2),
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_warm_up_worker)
+    return _extract_pool
 
 class TextExtractor:
     """Handles text extraction from various file types"""
     
+    @staticmethod
+    def submit(file_path, mime_type):
+        """Start extract_text() in a worker process and return its Future"""
+        return _get_extract_pool().submit(TextExtractor.extract_text, file_path, mime_type)
+    
+    @staticmethod
+    def extract_many(jobs):
+        """Extract text from several (file_path, mime_type) pairs across the worker processes
+
+        Every job is submitted straight away; the returned iterator yields the
+        results in the same order as the jobs.
+        """
+        if not jobs:
+            return iter(())
+        file_paths, mime_types = zip(*jobs)
+        return _get_extract_pool().map(TextExtractor.extract_text, file_paths, mime_types)
+    
     @staticmethod
     def extract_text(file_path, mime_type):
         """Extract text content from uploaded files"""
         try:
-            if mime_type == 'text/plain' or mime_type == 'text/markdown':
-                return TextExtractor._extract_plain_text(file_path)
-            
-            elif mime_type == 'application/pdf':
-                return TextExtractor._extract_pdf_text(file_path)
-            
-            elif mime_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
-                return TextExtractor._extract_word_text(file_path)
-            
-            elif mime_type.startswith('image/'):
-                return TextExtractor._handle_image_file(file_path)
+            extractor = EXTRACTORS_BY_MIME_TYPE.get(mime_type)
+            if extractor is None and mime_type.startswith('image/'):
+                extractor = TextExtractor._handle_image_file
             
-            elif mime_type == 'text/csv':
-                return TextExtractor._extract_csv_preview(file_path)
-            
-            elif mime_type == 'application/json':
-                return TextExtractor._extract_json_content(file_path)
-            
-            elif mime_type in ['text/html', 'text/xml']:
-                return TextExtractor._extract_markup_content(file_path)
-            
-            else:
+            if extractor is None:
                 return f"[File: {os.path.basename(file_path)} - Content type not supported for text extraction]"
+            return extractor(file_path)
                 
         except Exception as e:
-            print(f"Error extracting text from {file_path}: {e}")
+            logger.exception("Error extracting text from %s", file_path)
             return f"[File: {os.path.basename(file_path)} - Error reading file: {str(e)}]"
     
     @staticmethod
     def _extract_plain_text(file_path):
         """Extract text from plain text files"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return TextExtractor._read_all_text(file_path)
     
     @staticmethod
-    def _extract_pdf_text(file_path):
-        """Extract text from PDF files"""
-        try:
-            import PyPDF2
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text.strip()
-        except ImportError:
-            print("PyPDF2 not installed, cannot extract PDF text")
+    def _extract_pdf_text(file_path, max_chars=4000):
+        """Extract text from PDF files, stopping at the first page past max_chars"""
+        if pdfium is None and PyPDF2 is None:
+            logger.warning("PyPDF2 not installed, cannot extract PDF text")
             return f"[PDF file: {os.path.basename(file_path)} - Install PyPDF2 for text extraction]"
+        
+        try:
+            parts = []
+            total_len = 0
+            for page_text in TextExtractor._iter_pdf_pages(file_path):
+                parts.append(page_text)
+                total_len += len(page_text) + 1
+                # Only max_chars are ever sent to the model; going just past it keeps
+                # truncate_text() marking the text as truncated
+                if total_len > max_chars:
+                    break
+            return "\n".join(parts).strip()
         except Exception as e:
-            print(f"Error extracting PDF text: {e}")
+            logger.exception("Error extracting PDF text from %s", file_path)
             return f"[PDF file: {os.path.basename(file_path)} - Error extracting text: {str(e)}]"
     
     @staticmethod
-    def _extract_word_text(file_path):
-        """Extract text from Word documents"""
+    def _iter_pdf_pages(file_path):
+        """Yield the text of each PDF page, using PDFium when installed and PyPDF2 otherwise"""
+        if pdfium is not None:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                for page in pdf:
+                    text_page = page.get_textpage()
+                    try:
+                        yield text_page.get_text_range().replace('\r\n', '\n')
+                    finally:
+                        text_page.close()
+                        page.close()
+            finally:
+                pdf.close()
+        else:
+            with open(file_path, 'rb') as f:
+                for page in PyPDF2.PdfReader(f).pages:
+                    yield page.extract_text()
+    
+    @staticmethod
+    def _extract_word_text(file_path, max_chars=4000):
+        """Extract text from Word documents, stopping at the first paragraph past max_chars"""
+        if Document is None:
+            logger.warning("python-docx not installed, cannot extract Word document text")
+            return f"[Word document: {os.path.basename(file_path)} - Install python-docx for text extraction]"
+        
         try:
-            from docx import Document
             doc = Document(file_path)
-            text = ""
+            parts = []
+            total_len = 0
             for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
-        except ImportError:
-            print("python-docx not installed, cannot extract Word document text")
-            return f"[Word document: {os.path.basename(file_path)} - Install python-docx for text extraction]"
+                parts.append(paragraph.text)
+                total_len += len(paragraph.text) + 1
+                if total_len > max_chars:
+                    break
+            return "\n".join(parts).strip()
         except Exception as e:
-            print(f"Error extracting Word document text: {e}")
+            logger.exception("Error extracting Word document text from %s", file_path)
             return f"[Word document: {os.path.basename(file_path)} - Error extracting text: {str(e)}]"
     
     @staticmethod
@@ -85,21 +152,39 @@ class TextExtractor:
     def _extract_csv_preview(file_path):
         """Extract preview of CSV files"""
         with open(file_path, 'r', encoding='utf-8') as f:
-            # Read first few lines as preview
-            lines = f.readlines()[:10]
+            # Read only the first few lines as preview, each capped so one huge row can't pull in the file
+            lines = []
+            for _ in range(10):
+                line = f.readline(8192)
+                if not line:
+                    break
+                lines.append(line)
             return ''.join(lines)
     
     @staticmethod
     def _extract_json_content(file_path):
         """Extract content from JSON files"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return TextExtractor._read_all_text(file_path)
     
     @staticmethod
     def _extract_markup_content(file_path):
         """Extract content from HTML/XML files"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return TextExtractor._read_all_text(file_path)
+    
+    @staticmethod
+    def _read_all_text(file_path):
+        """Read a UTF-8 file in one decode, straight from a memory map for larger files"""
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 64 * 1024:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    text = str(mapped, 'utf-8')
+            else:
+                text = f.read().decode('utf-8')
+        
+        # Match text-mode universal newlines without a second pass over files that have no CRs
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
     
     @staticmethod
     def truncate_text(text, max_chars=4000):
@@ -108,3 +193,16 @@ class TextExtractor:
             return text
         
         return text[:max_chars] + "\n... [truncated]"
+
+# extract_text() dispatch table; image/* types are matched by prefix instead
+EXTRACTORS_BY_MIME_TYPE = {
+    'text/plain': TextExtractor._extract_plain_text,
+    'text/markdown': TextExtractor._extract_plain_text,
+    'application/pdf': TextExtractor._extract_pdf_text,
+    'application/msword': TextExtractor._extract_word_text,
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': TextExtractor._extract_word_text,
+    'text/csv': TextExtractor._extract_csv_preview,
+    'application/json': TextExtractor._extract_json_content,
+    'text/html': TextExtractor._extract_markup_content,
+    'text/xml': TextExtractor._extract_markup_content,
+}
@@ -60,10 +60,13 @@ a = Analysis(
         # Explicitly include the core packages we need
         'flask',
         'flask_sqlalchemy', 
+        'flask_caching',
         'sqlalchemy',
         'werkzeug',
         'jinja2',
         'requests',
+        'orjson',  # Optional fast JSON encoder
+        'pybase64',  # Optional fast base64 encoder
         
         # Document processing libraries with correct names
         'PyPDF2',
@@ -72,6 +75,7 @@ a = Analysis(
         'PyPDF2.utils',
         'PyPDF2.filters',
         'PyPDF2.pagerange',
+        'pypdfium2',  # Optional faster PDF text extraction
         'docx',  # This is python-docx
         'docx.document',
         'docx.shared',
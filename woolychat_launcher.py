@@ -8,12 +8,18 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import subprocess
 import threading
+import multiprocessing
+import queue
+import logging
 import webbrowser
-import re
 import os
 import sys
 import time
-import platform
+import shutil
+import codecs
+import importlib
+import traceback
+import http.client
 from pathlib import Path
 
 # Import your existing modules
@@ -22,24 +28,12 @@ try:
     import calendar
     import datetime
     import json
-    import os
-    import sys
-    import time
-    import threading
-    import subprocess
-    import webbrowser
-    import re
     import socket
     
-    # Import Flask and SQLAlchemy first to ensure they're available
-    import flask
-    import flask_sqlalchemy
     import requests
     
-    # Import your custom modules
-    from models import init_db, User, db
-    from utils import get_available_port
-    import ollama_chat
+    # Flask, SQLAlchemy and the app's own modules are imported where they are first
+    # used, off the UI thread, so the window doesn't wait for them to load
     
 except ImportError as e:
     print(f"Error importing modules: {e}")
@@ -54,6 +48,47 @@ except ImportError as e:
     
     sys.exit(1)
 
+OLLAMA_TAGS_URL = 'http://127.0.0.1:11434/api/tags'
+
+# Platform-specific values, picked once for the platform we are running on
+OLLAMA_INSTALL_PATHS = {
+    'darwin': [
+        '/usr/local/bin/ollama',  # Homebrew default
+        '/opt/homebrew/bin/ollama',  # Apple Silicon Homebrew
+        '/usr/bin/ollama',  # System installation
+        os.path.expanduser('~/.local/bin/ollama'),  # User installation
+        '/Applications/Ollama.app/Contents/Resources/ollama',  # Official installer
+    ],
+    'win32': [
+        # Standard per-user installation path, then a machine-wide install
+        os.path.join(os.environ.get('LOCALAPPDATA', os.path.join(os.path.expanduser("~"), "AppData", "Local")),
+                     "Programs", "Ollama", "ollama.exe"),
+        os.path.join(os.environ.get('ProgramFiles', r"C:\Program Files"), "Ollama", "ollama.exe"),
+    ],
+}.get(sys.platform, [])
+
+# 'ollama serve' runs in the background; on Windows, keep it from opening a console window
+OLLAMA_SERVE_CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
+OPEN_FOLDER_COMMAND = {
+    'darwin': 'open',  # Finder
+    'win32': 'explorer',
+}.get(sys.platform, 'xdg-open')  # Linux
+
+class ServerLogHandler(logging.Handler):
+    """Forwards log records from the in-process server to the launcher's server log"""
+    
+    def __init__(self, launcher):
+        super().__init__()
+        self.launcher = launcher
+        self.setFormatter(logging.Formatter('%(message)s'))
+    
+    def emit(self, record):
+        try:
+            self.launcher.server_log_message(self.format(record))
+        except Exception:
+            self.handleError(record)
+
 class WoolyChatLauncher:
     def __init__(self):
         self.root = tk.Tk()
@@ -63,21 +98,67 @@ class WoolyChatLauncher:
         
         # State management
         self.flask_process = None
+        self._werkzeug_srv = None  # The in-thread server, when the server runs in this process
         self.flask_port = None
         self.setup_complete = False
         self.ollama_running = False
+        self._ollama_path = None
+        self._ollama_status_cache = (0.0, None)  # (time.monotonic() of the probe, status)
+        self._log_queue = queue.Queue()
+        self._server_log_queue = queue.Queue()
+        self._install_dialog = None
+        self._model_dialog = None
+        self._probe_conn = None  # Keep-alive connection for the server's /health check
+        self._server_log_handler = None
+        
+        # Keep-alive connection to the local Ollama service, reused by every status probe
+        self._http = requests.Session()
         
         # Setup data directory for database and uploads
         self.setup_data_directory()
         
-        # Initialize database and check setup status
-        self.init_database()
-        self.check_setup_status()
+        # Initialize database and check setup status in the background,
+        # so the window is drawn while SQLAlchemy loads and migrations run
+        self._db_ready = threading.Event()
+        self._db_error = None
+        threading.Thread(target=self._prepare_database, daemon=True).start()
         
         # Create UI
         self.create_ui()
         
-        # Start with appropriate screen
+        # Start with appropriate screen once the database is ready
+        self.status_label.config(text="Loading...")
+        self.root.after(50, self._on_db_ready)
+        self.root.after(50, self._drain_log)
+    
+    def _prepare_database(self):
+        """Initialize the database and read the setup status (runs on a worker thread)"""
+        try:
+            self.init_database()
+            if self._db_error is None:
+                self.check_setup_status()
+        finally:
+            self._db_ready.set()
+        
+        # Load the server app now, while the user is looking at the window, so starting
+        # the server doesn't wait for the import; start_server() reports any failure
+        try:
+            importlib.import_module('ollama_chat')
+        except Exception:
+            pass
+    
+    def _on_db_ready(self):
+        """Show the first screen once _prepare_database() has finished"""
+        if not self._db_ready.is_set():
+            self.root.after(50, self._on_db_ready)
+            return
+        
+        if self._db_error is not None:
+            messagebox.showerror("Database Error", f"Failed to initialize database: {self._db_error}")
+            self.root.destroy()
+            sys.exit(1)
+        
+        self.status_label.config(text="Ready")
         if self.setup_complete:
             self.show_main_screen()
         else:
@@ -120,60 +201,32 @@ class WoolyChatLauncher:
     def init_database(self):
         """Initialize database with Flask app context"""
         try:
-            # Create a minimal Flask app for database initialization
             from flask import Flask
-            app = Flask(__name__)
-            app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.db_path}'
-            app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-            app.config['UPLOAD_FOLDER'] = self.uploads_dir
+            from models import init_db
             
-            with app.app_context():
-                # First, check if the database exists and handle migration
-                db_exists = os.path.exists(self.db_path)
-                
-                if db_exists:
-                    # Database exists, check if we need to add the setup_complete column
-                    import sqlite3
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    
-                    try:
-                        # Check if setup_complete column exists
-                        cursor.execute("PRAGMA table_info(user)")
-                        columns = [row[1] for row in cursor.fetchall()]
-                        
-                        if 'setup_complete' not in columns:
-                            # Add the missing column
-                            cursor.execute("ALTER TABLE user ADD COLUMN setup_complete BOOLEAN DEFAULT 0")
-                            conn.commit()
-                            print("Added setup_complete column to existing database")
-                        
-                    except sqlite3.Error as e:
-                        print(f"SQLite migration error: {e}")
-                    finally:
-                        conn.close()
-                
-                # Now initialize with SQLAlchemy
-                init_db(app)
+            # Create one minimal Flask app, shared by all of the launcher's database work
+            self.app = Flask(__name__)
+            self.app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.db_path}'
+            self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+            self.app.config['UPLOAD_FOLDER'] = self.uploads_dir
+            
+            with self.app.app_context():
+                # Schema migrations, including the setup_complete column, run in init_db()
+                init_db(self.app)
                     
         except Exception as e:
-            messagebox.showerror("Database Error", f"Failed to initialize database: {e}")
-            sys.exit(1)
+            # Reported by _on_db_ready() on the UI thread
+            self._db_error = e
     
     def check_setup_status(self):
         """Check if setup has been completed"""
+        from models import User, db, get_default_user_id
+        
         try:
-            from flask import Flask
-            app = Flask(__name__)
-            app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.db_path}'
-            app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-            
-            with app.app_context():
-                from models import db, User
-                db.init_app(app)
-                
+            with self.app.app_context():
                 # Now it's safe to query since migration happened in init_database()
-                user = User.query.first()
+                user_id = get_default_user_id()
+                user = db.session.get(User, user_id) if user_id is not None else None
                 if user:
                     self.setup_complete = user.setup_complete
                     print(f"Setup status check: user exists, setup_complete = {self.setup_complete}")
@@ -187,28 +240,20 @@ class WoolyChatLauncher:
     
     def mark_setup_complete(self):
         """Mark setup as complete in database"""
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        from models import User, db, get_default_user_id
+        
         try:
-            from flask import Flask
-            app = Flask(__name__)
-            app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.db_path}'
-            app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-            
-            with app.app_context():
-                from models import db, User
-                db.init_app(app)
-                
-                # Get existing user or create new one
-                user = User.query.first()
-                if user:
-                    user.setup_complete = True
-                    print("Marked existing user setup as complete")
-                else:
-                    # Create a default admin user with setup complete
-                    user = User(username='admin', setup_complete=True)
-                    db.session.add(user)
-                    print("Created new admin user with setup complete")
-                
+            with self.app.app_context():
+                # Flag the default user (the row check_setup_status() reads), creating it
+                # as admin if there is none, in a single upsert
+                db.session.execute(
+                    sqlite_insert(User)
+                    .values(id=get_default_user_id() or 1, username='admin', setup_complete=True)
+                    .on_conflict_do_update(index_elements=[User.id], set_={'setup_complete': True})
+                )
                 db.session.commit()
+                print("Marked admin user setup as complete")
                 
         except Exception as e:
             print(f"Error marking setup complete: {e}")
@@ -301,12 +346,35 @@ class WoolyChatLauncher:
         self.skip_setup_btn.grid(row=0, column=1)
     
     def log_message(self, message):
-        """Add message to log output"""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
-        self.root.update()
+        """Queue message for the log output; _drain_log() writes it out
+        
+        Safe to call from any thread, and before the setup log exists.
+        """
+        self._log_queue.put(message)
+    
+    def _drain_log(self):
+        """Write all queued setup and server log messages, one insert per log, then check again in 50 ms"""
+        for log_queue, widget_name in ((self._log_queue, 'log_text'), (self._server_log_queue, 'server_log')):
+            # Messages wait in the queue until the screen with their log has been created
+            log_widget = getattr(self, widget_name, None)
+            if log_widget is None or log_queue.empty():
+                continue
+            
+            lines = []
+            while True:
+                try:
+                    lines.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            # Once the main screen replaces the wizard there is nowhere to show setup messages
+            if log_widget.winfo_exists():
+                log_widget.config(state=tk.NORMAL)
+                log_widget.insert(tk.END, "\n".join(lines) + "\n")
+                log_widget.see(tk.END)
+                log_widget.config(state=tk.DISABLED)
+        
+        self.root.after(50, self._drain_log)
     
     def start_setup_process(self):
         """Start the setup process in a separate thread"""
@@ -352,61 +420,34 @@ class WoolyChatLauncher:
                 if len(models) > 5:
                     self.log_message(f"   ... and {len(models) - 5} more")
                 
-                self.setup_complete_success()
+                # Updates widgets, so it runs on the UI thread
+                self.root.after(0, self.setup_complete_success)
             
         except Exception as e:
             self.log_message(f"❌ Setup error: {str(e)}")
-            self.root.after(0, lambda: messagebox.showerror("Setup Error", str(e)))
+            self.root.after(0, lambda error=str(e): messagebox.showerror("Setup Error", error))
         finally:
             self.root.after(0, lambda: self.progress.stop())
     
     def find_ollama_path(self):
-        """Find the Ollama executable in common installation locations"""
-        system = platform.system()
-        
-        if system == "Darwin":  # macOS
-            common_paths = [
-                '/usr/local/bin/ollama',  # Homebrew default
-                '/opt/homebrew/bin/ollama',  # Apple Silicon Homebrew
-                '/usr/bin/ollama',  # System installation
-                os.path.expanduser('~/.local/bin/ollama'),  # User installation
-                '/Applications/Ollama.app/Contents/Resources/ollama',  # Official installer
-            ]
-            
-            # First try the system PATH using 'which'
-            try:
-                result = subprocess.run(['which', 'ollama'], capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    ollama_path = result.stdout.strip()
-                    if os.path.exists(ollama_path):
-                        return ollama_path
-            except:
-                pass
-            
-            # Then check common macOS locations
-            for path in common_paths:
-                if os.path.exists(path):
-                    return path
-                    
-        elif system == "Windows":
-         # For Windows, use the standard installation path
-            windows_ollama_path = os.path.join(
-                os.path.expanduser("~"),
-                "AppData", "Local", "Programs", "Ollama", "ollama.exe"
-            )
-            
-            if os.path.exists(windows_ollama_path):
-                return windows_ollama_path
-            
-            # Alternatively, try to use 'where' command (Windows equivalent of 'which')
-            try:
-                result = subprocess.run(['where', 'ollama'], capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    ollama_path = result.stdout.strip().split('\n')[0]  # Get first result
-                    if os.path.exists(ollama_path):
-                        return ollama_path
-            except:
-                pass
+        """Find the Ollama executable, searching only until it has been found once"""
+        if self._ollama_path and os.path.exists(self._ollama_path):
+            return self._ollama_path
+        
+        self._ollama_path = self._search_ollama_path()
+        return self._ollama_path
+    
+    def _search_ollama_path(self):
+        """Search the PATH and common installation locations for the Ollama executable"""
+        # First try the system PATH (scanned in-process instead of spawning 'which'/'where')
+        ollama_path = shutil.which('ollama')
+        if ollama_path:
+            return ollama_path
+        
+        # Then check the common installation locations for this platform
+        for path in OLLAMA_INSTALL_PATHS:
+            if os.path.exists(path):
+                return path
         
         return None
     
@@ -419,8 +460,37 @@ class WoolyChatLauncher:
         cmd = [ollama_path] + args
         return subprocess.run(cmd, **kwargs)
     
+    def _ollama_tags(self, timeout=2):
+        """Installed models as reported by the running Ollama service; raises if it is not reachable"""
+        response = self._http.get(OLLAMA_TAGS_URL, timeout=timeout)
+        response.raise_for_status()
+        return response.json()['models']
+    
+    def _ollama_responding(self, timeout=2):
+        """Whether the Ollama service answers on its HTTP API"""
+        try:
+            self._ollama_tags(timeout=timeout)
+            return True
+        except (requests.RequestException, ValueError, KeyError):
+            return False
+    
+    def _wait_for_ollama(self, timeout=5):
+        """Poll the Ollama service with a growing delay until it answers or timeout seconds pass"""
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            if self._ollama_responding(timeout=0.2):
+                return True
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.4)
+        return False
+    
     def check_ollama_installed(self):
         """Check if Ollama is installed"""
+        # A running service means it is installed, without spawning the executable
+        if self._ollama_responding():
+            return True
+        
         try:
             result = self.run_ollama_command(
                 ['--version'], 
@@ -434,21 +504,38 @@ class WoolyChatLauncher:
     
     def ask_user_install_ollama(self):
         """Ask user if they want to install Ollama"""
+        self.root.after(0, self._show_install_dialog)
+        return True
+    
+    def _show_install_dialog(self):
+        """Show the install Ollama dialog, building it the first time only"""
+        if self._install_dialog is None:
+            self._install_dialog = self._build_install_dialog()
+        
+        self._install_dialog.deiconify()
+        self._install_dialog.grab_set()
+    
+    def _build_install_dialog(self):
+        """Build the install Ollama dialog; it is hidden rather than destroyed when dismissed"""
         def on_install():
             self.log_message("🌐 Opening Ollama download page...")
             webbrowser.open("https://ollama.com")
             self.log_message("📝 Please install Ollama and restart WoolyChat")
-            install_dialog.destroy()
+            hide()
         
         def on_skip():
             self.log_message("⏭️ Skipping Ollama installation")
-            install_dialog.destroy()
+            hide()
+        
+        def hide():
+            install_dialog.grab_release()
+            install_dialog.withdraw()
         
         install_dialog = tk.Toplevel(self.root)
         install_dialog.title("Install Ollama")
         install_dialog.geometry("400x200")
         install_dialog.transient(self.root)
-        install_dialog.grab_set()
+        install_dialog.protocol("WM_DELETE_WINDOW", hide)
         
         ttk.Label(
             install_dialog, 
@@ -462,23 +549,24 @@ class WoolyChatLauncher:
         ttk.Button(button_frame, text="Download Ollama", command=on_install).pack(side=tk.LEFT, padx=10)
         ttk.Button(button_frame, text="Skip", command=on_skip).pack(side=tk.LEFT, padx=10)
         
-        return True
+        return install_dialog
+    
+    def _spawn_ollama_serve(self, ollama_path):
+        """Start 'ollama serve' detached from the launcher, discarding its output"""
+        subprocess.Popen(
+            [ollama_path, 'serve'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=OLLAMA_SERVE_CREATIONFLAGS,
+            start_new_session=os.name != 'nt'
+        )
     
     def ensure_ollama_running(self):
         """Ensure Ollama service is running"""
-        try:
-            # First check if already running
-            result = self.run_ollama_command(
-                ['list'], 
-                capture_output=True, 
-                text=True, 
-                timeout=5
-            )
-            if result.returncode == 0:
-                self.ollama_running = True
-                return True
-        except:
-            pass
+        # First check if already running
+        if self._ollama_responding():
+            self.ollama_running = True
+            return True
         
         # Try to start Ollama
         self.log_message("🚀 Starting Ollama service...")
@@ -488,18 +576,12 @@ class WoolyChatLauncher:
                 self.log_message("❌ Cannot find Ollama executable")
                 return False
                 
-            subprocess.Popen([ollama_path, 'serve'], creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0)
-            time.sleep(3)  # Give it time to start
+            self._spawn_ollama_serve(ollama_path)
             
-            # Check again
-            result = self.run_ollama_command(
-                ['list'], 
-                capture_output=True, 
-                text=True, 
-                timeout=5
-            )
-            if result.returncode == 0:
+            # Check again as soon as it answers
+            if self._wait_for_ollama():
                 self.ollama_running = True
+                self._ollama_status_cache = (0.0, None)
                 self.log_message("✅ Ollama service started")
                 return True
         except Exception as e:
@@ -510,107 +592,95 @@ class WoolyChatLauncher:
     def get_installed_models(self):
         """Get list of installed Ollama models"""
         try:
-            result = self.run_ollama_command(
-                ['list'], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            
-            if result.returncode != 0:
-                return []
-            
-            lines = result.stdout.strip().split('\n')
-            if len(lines) < 2:
-                return []
-            
-            # Check if header line matches expected format
-            header = lines[0]
-            if not re.match(r"NAME\s*ID\s*SIZE\s*MODIFIED", header):
-                return []
-            
-            # Extract model names from subsequent lines
-            models = []
-            for line in lines[1:]:
-                if line.strip():
-                    parts = line.split()
-                    if parts:
-                        models.append(parts[0])
-            
-            return models
-            
+            return [model['name'] for model in self._ollama_tags()]
         except Exception as e:
             self.log_message(f"Error checking models: {str(e)}")
             return []
     
     def handle_no_models(self):
         """Handle case where no models are installed"""
-        def show_model_selection():
-            model_dialog = tk.Toplevel(self.root)
-            model_dialog.title("Install AI Model")
-            model_dialog.geometry("500x400")
-            model_dialog.transient(self.root)
-            model_dialog.grab_set()
-            
-            ttk.Label(
-                model_dialog, 
-                text="No AI models found. Please choose a model to install:",
-                font=("Helvetica", 12, "bold")
-            ).pack(pady=10)
-            
-            # Model options
-            model_var = tk.StringVar(value="gemma3:4b")
+        self.root.after(0, self._show_model_dialog)
+    
+    def _show_model_dialog(self):
+        """Show the model selection dialog, building it the first time only"""
+        if self._model_dialog is None:
+            self._model_dialog = self._build_model_dialog()
+        
+        self._model_dialog.deiconify()
+        self._model_dialog.grab_set()
+    
+    def _build_model_dialog(self):
+        """Build the model selection dialog; it is hidden rather than destroyed when dismissed"""
+        model_dialog = tk.Toplevel(self.root)
+        model_dialog.title("Install AI Model")
+        model_dialog.geometry("500x400")
+        model_dialog.transient(self.root)
+        
+        ttk.Label(
+            model_dialog, 
+            text="No AI models found. Please choose a model to install:",
+            font=("Helvetica", 12, "bold")
+        ).pack(pady=10)
+        
+        # Model options
+        model_var = tk.StringVar(value="gemma3:4b")
 
-            models = [
-                ("gemma3:4b", "Overall/best all-around (3.3 GB)", "Recommended for most users"),
-                ("llama3.2:3b", "Lightweight general tasks (2.0 GB)", "Cannot analyze images"),
-                ("granite3.3:8b", "Strong instruction-following (4.9 GB)", "Cannot analyze images")
-            ]
-            
-            for model_name, description, note in models:
-                frame = ttk.Frame(model_dialog)
-                frame.pack(fill=tk.X, padx=20, pady=5)
-                
-                ttk.Radiobutton(
-                    frame, 
-                    text=f"{model_name} - {description}",
-                    variable=model_var, 
-                    value=model_name
-                ).pack(anchor=tk.W)
-                
-                ttk.Label(
-                    frame, 
-                    text=note, 
-                    font=("Helvetica", 9),
-                    foreground="gray"
-                ).pack(anchor=tk.W, padx=20)
-            
-            def install_selected_model():
-                selected_model = model_var.get()
-                model_dialog.destroy()
-                self.install_model(selected_model)
-            
-            def skip_model_install():
-                model_dialog.destroy()
-                self.log_message("⏭️ Skipping model installation")
-                self.setup_complete_success()
-            
-            button_frame = ttk.Frame(model_dialog)
-            button_frame.pack(pady=20)
+        models = [
+            ("gemma3:4b", "Overall/best all-around (3.3 GB)", "Recommended for most users"),
+            ("llama3.2:3b", "Lightweight general tasks (2.0 GB)", "Cannot analyze images"),
+            ("granite3.3:8b", "Strong instruction-following (4.9 GB)", "Cannot analyze images")
+        ]
+        
+        for model_name, description, note in models:
+            frame = ttk.Frame(model_dialog)
+            frame.pack(fill=tk.X, padx=20, pady=5)
             
-            ttk.Button(
-                button_frame, 
-                text="Install Model", 
-                command=install_selected_model
-            ).pack(side=tk.LEFT, padx=10)
+            ttk.Radiobutton(
+                frame, 
+                text=f"{model_name} - {description}",
+                variable=model_var, 
+                value=model_name
+            ).pack(anchor=tk.W)
             
-            ttk.Button(
-                button_frame, 
-                text="Skip", 
-                command=skip_model_install
-            ).pack(side=tk.LEFT, padx=10)
+            ttk.Label(
+                frame, 
+                text=note, 
+                font=("Helvetica", 9),
+                foreground="gray"
+            ).pack(anchor=tk.W, padx=20)
+        
+        def hide():
+            model_dialog.grab_release()
+            model_dialog.withdraw()
+        
+        def install_selected_model():
+            selected_model = model_var.get()
+            hide()
+            self.install_model(selected_model)
+        
+        def skip_model_install():
+            hide()
+            self.log_message("⏭️ Skipping model installation")
+            self.setup_complete_success()
         
-        self.root.after(0, show_model_selection)
+        model_dialog.protocol("WM_DELETE_WINDOW", hide)
+        
+        button_frame = ttk.Frame(model_dialog)
+        button_frame.pack(pady=20)
+        
+        ttk.Button(
+            button_frame, 
+            text="Install Model", 
+            command=install_selected_model
+        ).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(
+            button_frame, 
+            text="Skip", 
+            command=skip_model_install
+        ).pack(side=tk.LEFT, padx=10)
+        
+        return model_dialog
     
     def install_model(self, model_name):
         """Install the specified model"""
@@ -621,7 +691,7 @@ class WoolyChatLauncher:
             try:
                 ollama_path = self.find_ollama_path()
                 if not ollama_path:
-                    self.root.after(0, lambda: self.log_message("❌ Cannot find Ollama executable"))
+                    self.log_message("❌ Cannot find Ollama executable")
                     return
                 
                 process = subprocess.Popen(
@@ -629,24 +699,25 @@ class WoolyChatLauncher:
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
                     text=True,
-                    universal_newlines=True
+                    bufsize=1
                 )
                 
-                while True:
-                    output = process.stdout.readline()
-                    if output == '' and process.poll() is not None:
-                        break
+                # log_message() only queues, so progress lines go straight from this thread
+                # and are written out in batches by _drain_log()
+                for output in iter(process.stdout.readline, ''):
+                    output = output.strip()
                     if output:
-                        self.root.after(0, lambda o=output.strip(): self.log_message(f"   {o}"))
+                        self.log_message(f"   {output}")
+                process.wait()
                 
                 if process.returncode == 0:
-                    self.root.after(0, lambda: self.log_message(f"✅ Successfully installed {model_name}"))
+                    self.log_message(f"✅ Successfully installed {model_name}")
                     self.root.after(0, self.setup_complete_success)
                 else:
-                    self.root.after(0, lambda: self.log_message(f"❌ Failed to install {model_name}"))
+                    self.log_message(f"❌ Failed to install {model_name}")
                     
             except Exception as e:
-                self.root.after(0, lambda: self.log_message(f"❌ Installation error: {str(e)}"))
+                self.log_message(f"❌ Installation error: {str(e)}")
         
         install_thread = threading.Thread(target=run_install, daemon=True)
         install_thread.start()
@@ -691,12 +762,7 @@ class WoolyChatLauncher:
         
         # Make the path clickable to open in Finder/Explorer
         def open_data_folder():
-            if sys.platform == 'darwin':  # macOS
-                subprocess.run(['open', self.data_dir])
-            elif sys.platform == 'win32':  # Windows
-                subprocess.run(['explorer', self.data_dir])
-            else:  # Linux
-                subprocess.run(['xdg-open', self.data_dir])
+            subprocess.run([OPEN_FOLDER_COMMAND, self.data_dir])
         
         data_label.bind("<Button-1>", lambda e: open_data_folder())
         data_label.bind("<Enter>", lambda e: data_label.config(cursor="hand2"))
@@ -760,49 +826,82 @@ class WoolyChatLauncher:
         self.check_ollama_status()
     
     def check_ollama_status(self):
-        """Check if Ollama is running"""
-        try:
-            result = self.run_ollama_command(
-                ['list'], 
-                capture_output=True, 
-                text=True, 
-                timeout=5
-            )
-            if result.returncode == 0:
-                self.ollama_status_label.config(text="Running", foreground="green")
-                self.ollama_running = True
+        """Check if Ollama is running, probing in a separate thread so the UI stays responsive
+        
+        A result less than 2 seconds old is reused without probing again.
+        """
+        checked_at, status = self._ollama_status_cache
+        if status is not None and time.monotonic() - checked_at < 2.0:
+            self._show_ollama_status(*status)
+            return
+        
+        def probe():
+            if self._ollama_responding():
+                status = ("Running", "green", True)
+            elif self.find_ollama_path():
+                status = ("Stopped", "red", False)
             else:
-                self.ollama_status_label.config(text="Stopped", foreground="red")
-                self.ollama_running = False
-        except:
-            self.ollama_status_label.config(text="Not Available", foreground="red")
-            self.ollama_running = False
+                status = ("Not Available", "red", False)
+            
+            # Don't hold on to "not available"; the user may be installing Ollama right now
+            self._ollama_status_cache = (time.monotonic(), status if status[0] != "Not Available" else None)
+            self.root.after(0, lambda: self._show_ollama_status(*status))
+        
+        threading.Thread(target=probe, daemon=True).start()
+    
+    def _show_ollama_status(self, text, color, running):
+        """Update the Ollama status label with the result of check_ollama_status()"""
+        self.ollama_running = running
+        self.ollama_status_label.config(text=text, foreground=color)
     
     def start_server(self):
-        """Start the Flask server"""
+        """Start the Flask server, bringing up Ollama first if needed"""
+        # Starting Ollama can take a while, so it is done off the UI thread
+        self.start_server_btn.config(state=tk.DISABLED)
+        threading.Thread(target=self._ensure_ollama_for_server, daemon=True).start()
+    
+    def _ensure_ollama_for_server(self):
+        """Start Ollama if it isn't running, then start the Flask server (runs on a worker thread)"""
+        from utils import wait_for_port
+        
         try:
-            # First ensure Ollama is running
+            # It may have been started elsewhere since the last check
+            if not self.ollama_running and wait_for_port('127.0.0.1', 11434, timeout=0.05):
+                self.ollama_running = True
             if not self.ollama_running:
                 self.server_log_message("Starting Ollama service...")
                 ollama_path = self.find_ollama_path()
                 if ollama_path:
-                    subprocess.Popen([ollama_path, 'serve'])
-                    time.sleep(2)
-                    self.check_ollama_status()
+                    self._spawn_ollama_serve(ollama_path)
+                    if not wait_for_port('127.0.0.1', 11434, timeout=15.0):
+                        self.server_log_message("⚠️ Ollama did not start within 15 seconds")
+                    self._ollama_status_cache = (0.0, None)  # Ollama was just started
+                    self.root.after(0, self.check_ollama_status)
                 else:
                     self.server_log_message("❌ Cannot find Ollama executable")
-            
+        except Exception as e:
+            self.server_log_message(f"❌ Failed to start Ollama: {str(e)}")
+        
+        # The server starts either way; chats just fail until Ollama is available
+        self.root.after(0, self._start_flask_server)
+    
+    def _start_flask_server(self):
+        """Start the Flask server in this process, or as a subprocess with WOOLYCHAT_SUBPROCESS=1"""
+        from utils import get_available_port
+        
+        try:
             # Find available port
             self.flask_port = get_available_port(5000)
             self.server_log_message(f"Starting WoolyChat server on port {self.flask_port}...")
             
-            # Find the Flask script
+            # The server runs in this process; WOOLYCHAT_SUBPROCESS=1 runs it as a
+            # separate interpreter instead, for debugging from source
             if getattr(sys, 'frozen', False):
                 # Running from PyInstaller bundle - Flask app should be bundled
-                script_dir = sys._MEIPASS
-                self.server_log_message(f"Running from bundle: {script_dir}")
-                
-                # Try to import and run Flask directly instead of subprocess
+                self.server_log_message(f"Running from bundle: {sys._MEIPASS}")
+                self.start_flask_directly()
+                return
+            elif os.environ.get('WOOLYCHAT_SUBPROCESS') != '1':
                 self.start_flask_directly()
                 return
             else:
@@ -826,37 +925,45 @@ class WoolyChatLauncher:
                 [sys.executable, server_script],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
                 env=env,
                 cwd=script_dir
             )
             
-            # Wait a moment for server to start
-            time.sleep(2)
-            
-            # Check if the process is still running
-            if self.flask_process.poll() is not None:
-                self.server_log_message("❌ Flask process terminated immediately")
-                return
-            
-            # Test if server is actually responding
-            self.test_server_connection()
-            
-            # Update UI
-            self.flask_status_label.config(text=f"Running (port {self.flask_port})", foreground="green")
-            self.start_server_btn.config(state=tk.DISABLED)
-            self.stop_server_btn.config(state=tk.NORMAL)
-            self.open_browser_btn.config(state=tk.NORMAL)
-            
             # Start monitoring server output
             self.monitor_server_output()
             
+            # Wait for the server off the UI thread; the controls switch over once it answers
+            threading.Thread(target=self._wait_for_flask_process,
+                             args=(self.flask_process, self.flask_port), daemon=True).start()
+            
         except Exception as e:
             self.server_log_message(f"Error starting server: {str(e)}")
+            self.start_server_btn.config(state=tk.NORMAL)
             messagebox.showerror("Server Error", f"Failed to start server: {str(e)}")
     
+    def _wait_for_flask_process(self, process, port):
+        """Wait for the server subprocess to accept connections (runs on a worker thread)"""
+        from utils import wait_for_port
+        
+        wait_for_port('127.0.0.1', port)
+        
+        # Check if the process is still running
+        if process.poll() is not None:
+            self.server_log_message("❌ Flask process terminated immediately")
+            self.root.after(0, self._stop_ui_reset)
+            return
+        
+        # Test if server is actually responding
+        self.test_server_connection()
+        self.root.after(0, self._on_flask_ready)
+    
     def start_flask_directly(self):
-        """Start Flask directly in a thread when running from bundle"""
+        """Start Flask directly in a thread of this process"""
+        # Server and request logs go to the server log instead of a console nobody sees
+        if self._server_log_handler is None:
+            self._server_log_handler = ServerLogHandler(self)
+            logging.getLogger().addHandler(self._server_log_handler)
+        
         def run_flask():
             try:
                 self.server_log_message("Starting Flask directly in thread...")
@@ -872,61 +979,118 @@ class WoolyChatLauncher:
                 
                 self.server_log_message(f"Flask app created, starting on port {self.flask_port}")
                 
-                # Run the Flask app
-                app.run(host='127.0.0.1', port=self.flask_port, debug=False, use_reloader=False)
+                from werkzeug.serving import make_server
+                
+                # Bind first and report readiness, then serve (what app.run() does, minus the banner)
+                server = make_server('127.0.0.1', self.flask_port, app, threaded=True)
+                self._werkzeug_srv = server
+                self.test_server_connection()  # The socket is listening, so this connects straight away
+                self.root.after(0, self._on_flask_ready)
+                try:
+                    server.serve_forever()
+                finally:
+                    server.server_close()  # Release the port once shut down
                 
             except Exception as e:
-                self.root.after(0, lambda: self.server_log_message(f"❌ Flask error: {str(e)}"))
-                import traceback
-                self.root.after(0, lambda: self.server_log_message(traceback.format_exc()))
+                # Format here: the traceback is only available inside the except block
+                msg, tb = f"❌ Flask error: {str(e)}", traceback.format_exc()
+                self.root.after(0, lambda: self._apply_flask_error(msg, tb))
         
         # Start Flask in a daemon thread
         flask_thread = threading.Thread(target=run_flask, daemon=True)
         flask_thread.start()
-        
-        # Wait a moment then test connection
-        def delayed_test():
-            time.sleep(3)
-            self.root.after(0, self.test_server_connection)
-            self.root.after(0, lambda: self.flask_status_label.config(text=f"Running (port {self.flask_port})", foreground="green"))
-            self.root.after(0, lambda: self.start_server_btn.config(state=tk.DISABLED))
-            self.root.after(0, lambda: self.stop_server_btn.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.open_browser_btn.config(state=tk.NORMAL))
-        
-        test_thread = threading.Thread(target=delayed_test, daemon=True)
-        test_thread.start()
+    
+    def _apply_flask_error(self, msg, tb):
+        """Report an in-thread server failure in the server log and status label"""
+        self.server_log_message(msg)
+        self.server_log_message(tb)
+        self.flask_status_label.config(text="Error", foreground="red")
+        self.start_server_btn.config(state=tk.NORMAL)
+    
+    def _on_flask_ready(self):
+        """Switch the controls to running once the server is listening"""
+        self.flask_status_label.config(text=f"Running (port {self.flask_port})", foreground="green")
+        self.start_server_btn.config(state=tk.DISABLED)
+        self.stop_server_btn.config(state=tk.NORMAL)
+        self.open_browser_btn.config(state=tk.NORMAL)
     
     def test_server_connection(self):
-        """Test if the Flask server is actually responding"""
+        """Test if the Flask server is accepting connections"""
         try:
-            import urllib.request
-            url = f"http://127.0.0.1:{self.flask_port}/health"
-            
-            self.server_log_message(f"Testing connection to {url}...")
+            self.server_log_message(f"Testing connection to 127.0.0.1:{self.flask_port}...")
             
-            with urllib.request.urlopen(url, timeout=5) as response:
-                if response.status == 200:
-                    self.server_log_message("✅ Server is responding!")
-                    return True
-                else:
-                    self.server_log_message(f"⚠️ Server returned status {response.status}")
-                    return False
+            # A liveness check only needs the connect; no request is sent
+            with socket.create_connection(('127.0.0.1', self.flask_port), timeout=1.0):
+                self.server_log_message("✅ Server is responding!")
+                return True
                     
-        except Exception as e:
+        except OSError as e:
             self.server_log_message(f"❌ Server test failed: {str(e)}")
             return False
     
-    def stop_server(self):
-        """Stop the Flask server"""
-        if self.flask_process:
+    def check_server_health(self):
+        """GET /health over a kept-alive connection, reconnecting once if it has gone stale"""
+        for attempt in range(2):
+            conn = self._probe_conn
+            if conn is None or conn.port != self.flask_port:
+                if conn is not None:
+                    conn.close()
+                conn = self._probe_conn = http.client.HTTPConnection('127.0.0.1', self.flask_port, timeout=5)
             try:
-                self.flask_process.terminate()
-                self.flask_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.flask_process.kill()
-            
-            self.flask_process = None
-            self.flask_port = None
+                conn.request('GET', '/health')
+                response = conn.getresponse()
+                response.read()  # Drain the body so the connection can be reused
+                if response.status == 200:
+                    return True
+                self.server_log_message(f"⚠️ Server returned status {response.status}")
+                return False
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._probe_conn = None
+                if attempt:
+                    self.server_log_message(f"❌ Server health check failed: {str(e)}")
+        return False
+    
+    def stop_server(self):
+        """Stop the Flask server without waiting for it on the UI thread"""
+        process = self.flask_process
+        if process:
+            self.stop_server_btn.config(state=tk.DISABLED)
+            self.flask_status_label.config(text="Stopping...", foreground="orange")
+            threading.Thread(target=self._finalize_stop, args=(process,), daemon=True).start()
+        elif self._werkzeug_srv:
+            server, self._werkzeug_srv = self._werkzeug_srv, None
+            self.stop_server_btn.config(state=tk.DISABLED)
+            self.flask_status_label.config(text="Stopping...", foreground="orange")
+            threading.Thread(target=self._finalize_server_stop, args=(server,), daemon=True).start()
+        else:
+            self._stop_ui_reset()
+    
+    def _terminate_flask_process(self, process):
+        """Terminate the server process, killing it if it hasn't exited after 5 seconds"""
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    
+    def _finalize_stop(self, process):
+        """Terminate the server process and wait for it to exit (runs on a worker thread)"""
+        self._terminate_flask_process(process)
+        self.root.after(0, self._stop_ui_reset)
+    
+    def _finalize_server_stop(self, server):
+        """Shut down the in-thread server (runs on a worker thread, since shutdown()
+        waits for serve_forever() to return and would deadlock on the server's own thread)"""
+        server.shutdown()
+        self.root.after(0, self._stop_ui_reset)
+    
+    def _stop_ui_reset(self):
+        """Forget the stopped server and reset the server controls"""
+        self.flask_process = None
+        self.flask_port = None
+        self._ollama_status_cache = (0.0, None)
         
         # Update UI
         self.flask_status_label.config(text="Stopped", foreground="red")
@@ -941,35 +1105,60 @@ class WoolyChatLauncher:
         if self.flask_port:
             url = f"http://127.0.0.1:{self.flask_port}"
             
-            # Test connection first
-            if self.test_server_connection():
-                webbrowser.open(url)
-                self.server_log_message(f"Opened {url} in browser")
-            else:
-                self.server_log_message(f"❌ Cannot connect to server at {url}")
-                messagebox.showerror("Connection Error", 
-                    f"Cannot connect to WoolyChat server at {url}\n\n"
-                    "Please check the server log for errors.")
+            # Check the server in the background; a stuck server must not freeze the window
+            self.open_browser_btn.config(state=tk.DISABLED)
+            threading.Thread(target=self._open_browser_worker, args=(url,), daemon=True).start()
         else:
             messagebox.showerror("Server Error", "No server port available")
     
+    def _open_browser_worker(self, url):
+        """Make sure the app itself answers, not just the port, then open it (runs on a worker thread)"""
+        healthy = self.check_server_health()
+        self.root.after(0, lambda: self._finish_open_browser(url, healthy))
+    
+    def _finish_open_browser(self, url, healthy):
+        """Open the browser or report the failure, and re-enable the button if the server is still up"""
+        if self.flask_port:
+            self.open_browser_btn.config(state=tk.NORMAL)
+        
+        if healthy:
+            webbrowser.open(url)
+            self.server_log_message(f"Opened {url} in browser")
+        else:
+            self.server_log_message(f"❌ Cannot connect to server at {url}")
+            messagebox.showerror("Connection Error", 
+                f"Cannot connect to WoolyChat server at {url}\n\n"
+                "Please check the server log for errors.")
+    
     def server_log_message(self, message):
-        """Add message to server log"""
-        self.server_log.config(state=tk.NORMAL)
-        self.server_log.insert(tk.END, f"{message}\n")
-        self.server_log.see(tk.END)
-        self.server_log.config(state=tk.DISABLED)
-        self.root.update()
+        """Queue message for the server log; _drain_log() writes it out
+        
+        Safe to call from any thread.
+        """
+        self._server_log_queue.put(message)
     
     def monitor_server_output(self):
         """Monitor Flask server output in a separate thread"""
+        process = self.flask_process
+        
         def read_output():
-            if self.flask_process and self.flask_process.stdout:
+            if process and process.stdout:
+                # Take whatever the server has written in one read and queue it as one batch
+                # for the log drain; read1() returns b'' once the server exits
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                pending = ''
                 try:
-                    while self.flask_process.poll() is None:
-                        line = self.flask_process.stdout.readline()
-                        if line:
-                            self.root.after(0, lambda l=line.strip(): self.server_log_message(l))
+                    while True:
+                        chunk = process.stdout.read1(65536)
+                        if not chunk:
+                            break
+                        
+                        *lines, pending = (pending + decoder.decode(chunk)).split('\n')
+                        if lines:
+                            self.server_log_message('\n'.join(line.strip() for line in lines))
+                    
+                    if pending.strip():
+                        self.server_log_message(pending.strip())
                 except:
                     pass
         
@@ -978,8 +1167,17 @@ class WoolyChatLauncher:
     
     def on_closing(self):
         """Handle window closing"""
+        # Wait here rather than in a worker: the process must be gone before we exit
         if self.flask_process:
-            self.stop_server()
+            self._terminate_flask_process(self.flask_process)
+        
+        # Tell the in-thread server to stop rather than relying on daemon threads being
+        # torn down at exit, but don't let a stuck request hold the window open
+        if self._werkzeug_srv:
+            shutdown_thread = threading.Thread(target=self._werkzeug_srv.shutdown, daemon=True)
+            shutdown_thread.start()
+            shutdown_thread.join(timeout=2)
+            self._werkzeug_srv = None
         self.root.destroy()
     
     def run(self):
@@ -988,5 +1186,8 @@ class WoolyChatLauncher:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Text extraction runs in worker processes; in the bundled app those are
+    # spawned from this executable and must not start another launcher
+    multiprocessing.freeze_support()
     launcher = WoolyChatLauncher()
     launcher.run()
\ No newline at end of file